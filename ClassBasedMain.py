@@ -1,6 +1,26 @@
+import argparse
+import logging
 from email_auto_main_executor import EmailAutoMainExecutor
+from email_auto_profiler import EmailAutoProfiler
 
 
 # Entry point of the script
 if __name__ == "__main__":
-    app = EmailAutoMainExecutor()
+    parser = argparse.ArgumentParser(description="Send the configured email campaign.")
+    parser.add_argument('--plan', action='store_true',
+                        help="Only decide what would happen to each recipient and write it to <name>_Plan.csv")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Like --plan, but also render every message; nothing is sent or recorded")
+    parser.add_argument('--profile', action='store_true',
+                        help="Run against a local SMTP sink under cProfile and tracemalloc instead of sending mail")
+    parser.add_argument('--profile-top', type=int, default=40, help="Functions and allocation sites per report")
+    parser.add_argument('--profile-sink-latency-ms', type=float, default=0,
+                        help="Simulated SMTP sink latency per message, in milliseconds, while profiling")
+    args = parser.parse_args()
+
+    if args.profile:
+        EmailAutoProfiler(logging, args.profile_top, args.profile_top, args.profile_sink_latency_ms).run(EmailAutoMainExecutor)
+    elif args.plan or args.dry_run:
+        app = EmailAutoMainExecutor('plan' if args.plan else 'dry_run')
+    else:
+        app = EmailAutoMainExecutor()
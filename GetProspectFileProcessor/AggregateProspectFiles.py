@@ -0,0 +1,221 @@
+import argparse
+import codecs
+import csv
+import heapq
+import json
+import os
+import sys
+import tempfile
+import time
+import logging
+from pathlib import Path
+
+# Make the EmailAutomator modules in the parent folder importable when run as a script
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from email_auto_recipient_deduper import EmailAutoRecipientDeduper
+from email_auto_recipient_source import EmailAutoRecipientSource
+
+# Define the file types picked up when a folder is given
+input_patterns = ("*.csv", "*.xlsx")
+
+# Define the memory budget for buffered rows before a sorted run is spilled to disk
+default_memory_mb = 64
+
+# Define how many sorted runs are merged at once, to stay well inside open file limits
+merge_fan_in = 64
+
+# Define the rules for choosing the winning row when several sources list the same email
+winner_rules = ("first", "last", "newest", "most_complete")
+
+# Define the per-row bookkeeping overhead used in the memory estimate
+row_overhead_bytes = 200
+
+
+# Function to name the conflicts report written next to the master list
+def conflicts_file_for(output_file):
+    return os.path.splitext(output_file)[0] + "_Conflicts.csv"
+
+# Function to expand folders into the CSV/XLSX files they contain, keeping the given order
+def expand_inputs(inputs, output_file):
+    files = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            for pattern in input_patterns:
+                files.extend(sorted(path.glob(pattern)))
+        else:
+            files.append(path)
+    output_paths = {Path(output_file).resolve(), Path(conflicts_file_for(output_file)).resolve()}
+    # Never read the master list or its conflicts report back in as one of its own sources
+    return [file for file in dict.fromkeys(files) if file.resolve() not in output_paths]
+
+# Function to pick a CSV encoding, falling back to cp1252 for exports saved from Excel on Windows
+def detect_encoding(file_path):
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    try:
+        with open(file_path, "rb") as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                decoder.decode(chunk)
+            decoder.decode(b"", final=True)
+        return "utf-8-sig"
+    except UnicodeDecodeError:
+        return "cp1252"
+
+# Function to estimate how much memory a buffered row takes
+def row_size(row):
+    return row_overhead_bytes + sum(len(key) + len(value) for key, value in row.items())
+
+# Function to sort buffered records and spill them to a run file, one JSON record per line
+def write_run(records, run_directory, run_number):
+    records.sort(key=lambda record: (record[0], record[1], record[2]))
+    run_file = os.path.join(run_directory, f"run_{run_number:05d}.jsonl")
+    with open(run_file, "w", encoding="utf-8") as file:
+        for record in records:
+            file.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return run_file
+
+# Function to read a run file back as records
+def read_run(run_file):
+    with open(run_file, "r", encoding="utf-8") as file:
+        for line in file:
+            yield json.loads(line)
+
+# Function to read every source into sorted runs within the memory budget
+def build_runs(files, run_directory, memory_budget, deduper):
+    runs = []
+    records = []
+    buffered_bytes = 0
+    fieldnames = []
+    counts = {"rows": 0, "skipped": 0, "skipped_sources": 0}
+    for source_index, file in enumerate(files):
+        encoding = None if file.suffix.lower() in (".xlsx", ".xlsm") else detect_encoding(file)
+        # Workbooks are read with openpyxl in read-only mode, so only the rows being buffered are held;
+        # a sheet without an email column is skipped on its own and the workbook's other sheets are still read
+        source = EmailAutoRecipientSource(logging, str(file), encoding=encoding, skip_invalid_sheets=True)
+        row_number = 0
+        try:
+            # One table per CSV file or XLSX sheet; a CSV file without an email column raises ValueError
+            for table_fieldnames, rows in source.iter_tables():
+                fieldnames.extend(field for field in table_fieldnames if field not in fieldnames)
+                for row in rows:
+                    row_number += 1
+                    normalized_email = deduper.normalize(row["emailId"])
+                    if "@" not in normalized_email:
+                        counts["skipped"] += 1
+                        continue
+                    counts["rows"] += 1
+                    row["emailId"] = normalized_email
+                    records.append((normalized_email, source_index, row_number, row))
+                    buffered_bytes += row_size(row)
+                    if buffered_bytes >= memory_budget:
+                        runs.append(write_run(records, run_directory, len(runs)))
+                        records = []
+                        buffered_bytes = 0
+        except ValueError as e:
+            print(f"Skipping {file}: {e}")
+            counts["skipped_sources"] += 1
+            continue
+        for sheet_name in source.skipped_sheets:
+            print(f"Skipping sheet '{sheet_name}' of {file}: no email column")
+        counts["skipped_sources"] += len(source.skipped_sheets)
+        print(f"Read {file}")
+    if records:
+        runs.append(write_run(records, run_directory, len(runs)))
+    return runs, fieldnames, counts
+
+# Function to merge runs in passes of at most merge_fan_in files until one sorted stream is left
+def merge_runs(runs, run_directory):
+    generation = 0
+    while len(runs) > merge_fan_in:
+        merged_runs = []
+        for start in range(0, len(runs), merge_fan_in):
+            group = runs[start:start + merge_fan_in]
+            merged = heapq.merge(*(read_run(run) for run in group), key=lambda record: (record[0], record[1], record[2]))
+            run_file = os.path.join(run_directory, f"merge_{generation:03d}_{start // merge_fan_in:05d}.jsonl")
+            with open(run_file, "w", encoding="utf-8") as file:
+                for record in merged:
+                    file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            for run in group:
+                os.remove(run)
+            merged_runs.append(run_file)
+        runs = merged_runs
+        generation += 1
+    return heapq.merge(*(read_run(run) for run in runs), key=lambda record: (record[0], record[1], record[2]))
+
+# Function to group the sorted stream into all records for one normalized email
+def group_by_email(records):
+    group = []
+    for record in records:
+        if group and record[0] != group[0][0]:
+            yield group
+            group = []
+        group.append(record)
+    if group:
+        yield group
+
+# Function to choose the winning record of a group according to the configured rule
+def pick_winner(group, rule, source_mtimes):
+    if rule == "first":
+        return group[0]
+    if rule == "last":
+        return group[-1]
+    if rule == "newest":
+        return max(group, key=lambda record: (source_mtimes[record[1]], -record[1]))
+    # most_complete: most filled-in fields, earliest source on a tie
+    return max(group, key=lambda record: (sum(1 for value in record[3].values() if value), -record[1], -record[2]))
+
+# Function to merge any number of prospect lists into one deduplicated master list
+def aggregate_files(inputs, output_file, rule="most_complete", memory_mb=default_memory_mb, strip_plus_tags=False):
+    started_at = time.perf_counter()
+    files = expand_inputs(inputs, output_file)
+    source_names = [str(file) for file in files]
+    source_mtimes = [file.stat().st_mtime for file in files]
+    deduper = EmailAutoRecipientDeduper(logging, strip_plus_tags=strip_plus_tags)
+    conflicts_file = conflicts_file_for(output_file)
+    summary = {"sources": len(files), "unique": 0, "duplicates": 0, "conflicts": 0}
+    with tempfile.TemporaryDirectory(prefix="aggregate_runs_") as run_directory:
+        runs, fieldnames, counts = build_runs(files, run_directory, memory_mb * 1024 * 1024, deduper)
+        summary.update(counts, runs=len(runs))
+        temp_file = output_file + ".tmp"
+        with open(temp_file, "w", newline="", encoding="utf-8") as output, \
+                open(conflicts_file, "w", newline="", encoding="utf-8") as conflicts:
+            writer = csv.DictWriter(output, fieldnames=fieldnames + ["sourceFile"], extrasaction="ignore")
+            conflict_writer = csv.writer(conflicts)
+            writer.writeheader()
+            conflict_writer.writerow(["normalizedEmail", "winningSource", "otherSource", "differingFields"])
+            for group in group_by_email(merge_runs(runs, run_directory)):
+                winner = pick_winner(group, rule, source_mtimes)
+                writer.writerow(dict(winner[3], sourceFile=source_names[winner[1]]))
+                summary["unique"] += 1
+                summary["duplicates"] += len(group) - 1
+                # Record every source that disagrees with the winning row on a field both of them filled in
+                for record in group:
+                    if record is winner:
+                        continue
+                    differing = [field for field, value in record[3].items()
+                                 if value and winner[3].get(field) and value != winner[3][field]]
+                    if differing:
+                        summary["conflicts"] += 1
+                        conflict_writer.writerow([winner[0], source_names[winner[1]], source_names[record[1]],
+                                                  ";".join(differing)])
+        os.replace(temp_file, output_file)
+    summary["seconds"] = round(time.perf_counter() - started_at, 3)
+    print(f"Wrote {summary['unique']} prospects to {output_file}; conflicts listed in {conflicts_file}")
+    print(f"Aggregation finished: {summary}")
+    return summary
+
+# Main function
+def main():
+    parser = argparse.ArgumentParser(description="Merge prospect lists into one deduplicated master list.")
+    parser.add_argument("inputs", nargs="+", help="CSV/XLSX files or folders, in priority order")
+    parser.add_argument("--output", default=os.path.join("Email Lists", "Aggregated.csv"))
+    parser.add_argument("--rule", choices=winner_rules, default="most_complete",
+                        help="Which row wins when sources list the same email")
+    parser.add_argument("--memory-mb", type=int, default=default_memory_mb, help="Rows buffered before spilling a sorted run")
+    parser.add_argument("--strip-plus-tags", action="store_true", help="Treat name+tag@domain as name@domain")
+    args = parser.parse_args()
+    aggregate_files(args.inputs, args.output, args.rule, args.memory_mb, args.strip_plus_tags)
+
+# Execute main function
+if __name__ == "__main__":
+    main()
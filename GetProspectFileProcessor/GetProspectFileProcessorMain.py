@@ -1,13 +1,40 @@
+import argparse
+import hashlib
+import os
 import pandas as pd
 import sqlite3
+import sys
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
+# Make the EmailAutomator modules in the parent folder importable when run as a script
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from email_auto_excel_cache import EmailAutoExcelCache
+
 # Define the filename of the CSV file
 csv_filename = "./csvFiles/All_Contacts_2024_04_21_1.csv"
 
 # Define the SQLite database filename
 db_filename = "data.sqlite"
 
+# Define the table that folder ingest appends to, and the manifest of files already loaded
+ingest_table = "data"
+manifest_table = "ingest_manifest"
+
+# Define the file types picked up by folder ingest
+ingest_patterns = ("*.csv", "*.xlsx")
+
+# Define how many rows go into one executemany call
+insert_batch_size = 5000
+
+# Define the prospects table, kept unique on the normalized email, and how many emails are looked up at once
+prospects_table = "prospects"
+prospects_reserved_columns = ("normalizedEmail", "sourceFile", "updatedAt")
+email_column_keys = ("email", "emailid", "emailaddress", "workemail", "mail")
+lookup_batch_size = 500
+
 # Function to rename columns using camelCase
 def camelcase(text):
     words = text.split()
@@ -53,6 +80,9 @@ def connect_to_database(db_filename):
 def insert_into_database(conn, df):
     # Insert DataFrame into SQLite database
     df.to_sql("data", conn, if_exists="replace", index=False)
+    # The folder ingest manifest described the table just replaced, so those files must be loaded again
+    conn.execute(f"DROP TABLE IF EXISTS {manifest_table}")
+    conn.commit()
 
 
 # Function to load data from CSV files in a folder
@@ -67,9 +97,296 @@ def load_data_from_folder(folder_path):
 
 
 
-        
+# Function to quote a column or table name for SQLite
+def quote_identifier(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+# Function to hash a file in chunks so large exports are never read into memory at once
+def file_sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# Function to yield (sheet name, row tuples) for every sheet, from the Excel cache when it is enabled
+def iter_workbook_sheets(file_path, excel_cache=False):
+    if excel_cache:
+        yield from EmailAutoExcelCache(logging).iter_sheet_rows(file_path)
+        return
+    from openpyxl import load_workbook
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for sheet_name in workbook.sheetnames:
+            yield sheet_name, workbook[sheet_name].iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+# Function to load every sheet of a workbook into one DataFrame
+def load_excel_data(file_path, excel_cache=False):
+    frames = []
+    for sheet_name, rows in iter_workbook_sheets(file_path, excel_cache):
+        rows = list(rows)
+        if not rows:
+            continue
+        headers = [f"Unnamed: {index}" if header is None else str(header) for index, header in enumerate(rows[0])]
+        frames.append(pd.DataFrame.from_records(rows[1:], columns=headers))
+    if not frames:
+        return pd.DataFrame()
+    # Sheets with different headers line up by column name; cells a sheet lacks become NULL
+    return pd.concat(frames, ignore_index=True, sort=False)
+
+# Function to parse one prospect file into column names and row tuples (runs in a worker process)
+def parse_prospect_file(file_path, excel_cache=False):
+    if str(file_path).lower().endswith(".xlsx"):
+        df = load_excel_data(file_path, excel_cache)
+    else:
+        try:
+            df = pd.read_csv(file_path)
+        except UnicodeDecodeError:
+            # Exports saved from Excel on Windows are often cp1252 rather than UTF-8
+            df = pd.read_csv(file_path, encoding="cp1252")
+    df.columns = [str(col) for col in df.columns]
+    df = rename_columns(df)
+    df = clean_data(df)
+    # Missing values become NULL instead of the float NaN pandas uses
+    df = df.astype(object).where(pd.notnull(df), None)
+    rows = [tuple(to_sql_value(value) for value in row) for row in df.itertuples(index=False, name=None)]
+    return str(file_path), list(df.columns), rows
+
+# Function to turn a parsed cell into a value SQLite can store (dates and other objects become text)
+def to_sql_value(value):
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return str(value)
+
+# Function to prepare the database for fast bulk loading
+def prepare_ingest_database(conn):
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {manifest_table} (
+            path TEXT PRIMARY KEY,
+            sha256 TEXT NOT NULL,
+            mtime REAL NOT NULL,
+            size INTEGER NOT NULL,
+            row_count INTEGER NOT NULL,
+            ingested_at TEXT NOT NULL
+        )""")
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {quote_identifier(ingest_table)} (sourceFile TEXT)")
+    # A data table written by the single-file load has no sourceFile column yet
+    ensure_columns(conn, ["sourceFile"])
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{ingest_table}_sourceFile ON {quote_identifier(ingest_table)} (sourceFile)")
+    conn.commit()
+    prepare_prospects_table(conn)
+
+# Function to read the manifest of already ingested files
+def read_manifest(conn):
+    rows = conn.execute(f"SELECT path, sha256, mtime, size FROM {manifest_table}")
+    return {path: (sha256, mtime, size) for path, sha256, mtime, size in rows}
+
+# Function to forget files that were removed from disk, so they are loaded again if they come back
+def prune_manifest(conn, manifest):
+    missing_paths = [path for path in manifest if not os.path.exists(path)]
+    with conn:
+        conn.executemany(f"DELETE FROM {manifest_table} WHERE path = ?", ((path,) for path in missing_paths))
+    for path in missing_paths:
+        print(f"Dropped missing file from the manifest: {path}")
+        del manifest[path]
+    return manifest
+
+# Function to decide which files in the folder are new or changed since the last ingest
+def find_changed_files(folder_path, manifest):
+    changed_files = []
+    unchanged_files = []
+    for pattern in ingest_patterns:
+        for file in sorted(Path(folder_path).glob(pattern)):
+            stat = file.stat()
+            previous = manifest.get(str(file))
+            # Same mtime and size: trust the manifest without hashing the file again
+            if previous and previous[1] == stat.st_mtime and previous[2] == stat.st_size:
+                unchanged_files.append(file)
+                continue
+            sha256 = file_sha256(file)
+            if previous and previous[0] == sha256:
+                unchanged_files.append(file)
+                continue
+            changed_files.append((file, sha256, stat.st_mtime, stat.st_size))
+    return changed_files, unchanged_files
+
+# Function to add columns that a new file brings to a table
+def ensure_columns(conn, columns, table=ingest_table):
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({quote_identifier(table)})")}
+    for column in columns:
+        if column not in existing:
+            conn.execute(f"ALTER TABLE {quote_identifier(table)} ADD COLUMN {quote_identifier(column)}")
+            existing.add(column)
+
+# Function to normalize an email address for the unique prospects index
+def normalize_email(value):
+    if value is None:
+        return None
+    email = str(value).strip().lower()
+    return email if "@" in email else None
+
+# Function to find the email column among the camelCase column names
+def find_email_column(columns):
+    keys = ["".join(ch for ch in str(column).lower() if ch.isalnum()) for column in columns]
+    for candidate in email_column_keys:
+        if candidate in keys:
+            return columns[keys.index(candidate)]
+    return None
+
+# Function to create the prospects table with a unique index on the normalized email
+def prepare_prospects_table(conn):
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {prospects_table} (normalizedEmail TEXT NOT NULL, sourceFile TEXT, updatedAt TEXT)")
+    conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{prospects_table}_normalizedEmail ON {prospects_table} (normalizedEmail)")
+    conn.commit()
+
+# Function to upsert one file's rows into the prospects table, touching only rows that are new or changed
+def upsert_prospects(conn, file_path, columns, rows):
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0, "duplicates": 0, "skipped": 0}
+    email_column = find_email_column(columns)
+    if email_column is None:
+        print(f"No email column in {file_path}; skipping {len(rows)} rows for prospects.")
+        counts["skipped"] = len(rows)
+        return counts
+    email_index = columns.index(email_column)
+    keep = [index for index, column in enumerate(columns)
+            if column not in columns[:index] and column not in prospects_reserved_columns]
+    column_names = [columns[index] for index in keep]
+    # Later rows for the same address win within a file
+    latest = {}
+    for row in rows:
+        email = normalize_email(row[email_index])
+        if email is None:
+            counts["skipped"] += 1
+            continue
+        if email in latest:
+            counts["duplicates"] += 1
+        latest[email] = tuple(row[index] for index in keep)
+    column_sql = ", ".join(quote_identifier(column) for column in column_names)
+    upsert_sql = (f"INSERT INTO {prospects_table} (normalizedEmail, sourceFile, updatedAt, {column_sql}) "
+                  f"VALUES (?, ?, datetime('now'), {', '.join('?' for _ in column_names)}) "
+                  f"ON CONFLICT(normalizedEmail) DO UPDATE SET sourceFile = excluded.sourceFile, "
+                  f"updatedAt = excluded.updatedAt, "
+                  + ", ".join(f"{quote_identifier(column)} = excluded.{quote_identifier(column)}" for column in column_names))
+    emails = list(latest)
+    with conn:
+        ensure_columns(conn, column_names, prospects_table)
+        for start in range(0, len(emails), lookup_batch_size):
+            batch = emails[start:start + lookup_batch_size]
+            # Indexed lookups of just this batch, so the cost follows the file size and not the table size
+            existing = {row[0]: tuple(row[1:]) for row in conn.execute(
+                f"SELECT normalizedEmail, {column_sql} FROM {prospects_table} "
+                f"WHERE normalizedEmail IN ({', '.join('?' for _ in batch)})", batch)}
+            changed_rows = []
+            for email in batch:
+                values = latest[email]
+                previous = existing.get(email)
+                if previous is None:
+                    counts["inserted"] += 1
+                elif previous == values:
+                    counts["unchanged"] += 1
+                    continue
+                else:
+                    counts["updated"] += 1
+                changed_rows.append((email, file_path) + values)
+            conn.executemany(upsert_sql, changed_rows)
+    print(f"Prospects from {file_path}: {counts}")
+    return counts
+
+# Function to parse files one by one and upsert them into the prospects table
+def upsert_prospect_files(file_paths, db_filename, excel_cache=False):
+    conn = connect_to_database(db_filename)
+    # Upserts only touch the prospects table, so a data table from the single-file load is left as it is
+    conn.execute("PRAGMA journal_mode=WAL")
+    prepare_prospects_table(conn)
+    totals = {"inserted": 0, "updated": 0, "unchanged": 0, "duplicates": 0, "skipped": 0}
+    for file_path in file_paths:
+        file_path, columns, rows = parse_prospect_file(file_path, excel_cache)
+        for key, count in upsert_prospects(conn, file_path, columns, rows).items():
+            totals[key] += count
+    conn.close()
+    print(f"Prospects upsert finished: {totals}")
+    return totals
+
+# Function to replace one file's rows and record it in the manifest within a single transaction
+def store_parsed_file(conn, file_path, columns, rows, sha256, mtime, size):
+    # Duplicate headers after renaming would collide in SQL; keep the first occurrence
+    keep = [index for index, column in enumerate(columns) if column not in columns[:index]]
+    columns = [columns[index] for index in keep]
+    with conn:
+        ensure_columns(conn, columns)
+        conn.execute(f"DELETE FROM {quote_identifier(ingest_table)} WHERE sourceFile = ?", (file_path,))
+        insert_sql = (f"INSERT INTO {quote_identifier(ingest_table)} "
+                      f"(sourceFile, {', '.join(quote_identifier(column) for column in columns)}) "
+                      f"VALUES (?, {', '.join('?' for _ in columns)})")
+        for start in range(0, len(rows), insert_batch_size):
+            batch = rows[start:start + insert_batch_size]
+            conn.executemany(insert_sql, ((file_path,) + tuple(row[index] for index in keep) for row in batch))
+        conn.execute(f"""
+            INSERT INTO {manifest_table} (path, sha256, mtime, size, row_count, ingested_at)
+            VALUES (?, ?, ?, ?, ?, datetime('now'))
+            ON CONFLICT(path) DO UPDATE SET sha256 = excluded.sha256, mtime = excluded.mtime,
+                size = excluded.size, row_count = excluded.row_count, ingested_at = excluded.ingested_at
+        """, (file_path, sha256, mtime, size, len(rows)))
+
+# Function to ingest every new or changed file in a folder, parsing in parallel and writing from one process
+def ingest_folder(folder_path, db_filename, workers=None, update_prospects=False, excel_cache=False):
+    started_at = time.perf_counter()
+    conn = connect_to_database(db_filename)
+    prepare_ingest_database(conn)
+    changed_files, unchanged_files = find_changed_files(folder_path, prune_manifest(conn, read_manifest(conn)))
+    for file in unchanged_files:
+        print(f"Skipping unchanged file: {file}")
+    ingested_rows = 0
+    failed_files = []
+    if changed_files:
+        details = {str(file): (sha256, mtime, size) for file, sha256, mtime, size in changed_files}
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(parse_prospect_file, str(file), excel_cache): str(file) for file, _, _, _ in changed_files}
+            for future in as_completed(futures):
+                file_path = futures[future]
+                try:
+                    file_path, columns, rows = future.result()
+                except Exception as e:
+                    print(f"Failed to parse {file_path}: {e}")
+                    failed_files.append(file_path)
+                    continue
+                store_parsed_file(conn, file_path, columns, rows, *details[file_path])
+                if update_prospects:
+                    upsert_prospects(conn, file_path, columns, rows)
+                ingested_rows += len(rows)
+                print(f"Ingested {len(rows)} rows from {file_path}")
+    conn.close()
+    summary = {
+        "ingested_files": len(changed_files) - len(failed_files),
+        "skipped_files": len(unchanged_files),
+        "failed_files": failed_files,
+        "ingested_rows": ingested_rows,
+        "seconds": round(time.perf_counter() - started_at, 3)
+    }
+    print(f"Folder ingest finished: {summary}")
+    return summary
+
 # Main function
 def main():
+    parser = argparse.ArgumentParser(description="Load prospect exports into SQLite.")
+    parser.add_argument("--folder", help="Ingest every new or changed CSV/XLSX file in this folder (e.g. 'Email Lists')")
+    parser.add_argument("--db", default=db_filename)
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument("--prospects", action="store_true", help="With --folder, also upsert changed files into the prospects table")
+    parser.add_argument("--upsert", nargs="+", help="Upsert these CSV/XLSX files into the prospects table")
+    parser.add_argument("--excel-cache", action="store_true", help="Reuse parsed workbooks from the Excel cache")
+    args = parser.parse_args()
+    if args.upsert:
+        upsert_prospect_files(args.upsert, args.db, args.excel_cache)
+        return
+    if args.folder:
+        ingest_folder(args.folder, args.db, args.workers, args.prospects, args.excel_cache)
+        return
+
     # Load data from CSV
     df = load_data(csv_filename)
     # Rename columns without spaces
@@ -88,7 +405,7 @@ def main():
         print("No duplicates found.")
     
     # Connect to SQLite database
-    conn = connect_to_database(db_filename)
+    conn = connect_to_database(args.db)
     
     # Insert data into database
     insert_into_database(conn, df_cleaned)
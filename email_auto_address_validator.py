@@ -0,0 +1,246 @@
+import csv
+import json
+import os
+import re
+import socket
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+class EmailAutoMXLookupError(Exception):
+    # Raised when a lookup could not be completed (timeout, no DNS); the address is then not failed
+    pass
+
+
+class EmailAutoDNSResolver:
+    def __init__(self, timeout=5.0):
+        self.timeout = timeout
+        try:
+            import dns.resolver
+            self.dns_resolver = dns.resolver
+        except ImportError:
+            # dnspython is optional; without it the A/AAAA fallback of RFC 5321 section 5.1 is used
+            self.dns_resolver = None
+
+    def resolve(self, domain):
+        if self.dns_resolver:
+            try:
+                answers = self.dns_resolver.resolve(domain, 'MX', lifetime=self.timeout)
+                return sorted(str(answer.exchange).rstrip('.') for answer in answers)
+            except (self.dns_resolver.NXDOMAIN, self.dns_resolver.NoAnswer):
+                pass
+            except Exception as e:
+                raise EmailAutoMXLookupError(str(e))
+        try:
+            socket.getaddrinfo(domain, 25, proto=socket.IPPROTO_TCP)
+            return [domain]
+        except socket.gaierror as e:
+            if e.errno in (socket.EAI_NONAME, getattr(socket, 'EAI_NODATA', socket.EAI_NONAME)):
+                return []
+            raise EmailAutoMXLookupError(str(e))
+
+
+class EmailAutoStubResolver:
+    def __init__(self, records=None):
+        # {domain: [mx hosts]}; unknown domains have no MX
+        self.records = records or {}
+
+    @classmethod
+    def from_file(cls, stub_file):
+        # One domain per line followed by its MX hosts; a domain with no hosts has no MX
+        records = {}
+        with open(stub_file, 'r') as file:
+            for line in file:
+                parts = line.split()
+                if parts and not parts[0].startswith('#'):
+                    records[parts[0].lower()] = parts[1:]
+        return cls(records)
+
+    def resolve(self, domain):
+        return list(self.records.get(domain, []))
+
+
+class EmailAutoCacheOnlyResolver:
+    # Used by plan and dry-run passes: no live lookups, so domains missing from the MX cache are not judged
+    def resolve(self, domain):
+        raise EmailAutoMXLookupError("not in the MX cache; not checked in this pass")
+
+
+class EmailAutoMXCache:
+    def __init__(self, logging, cache_file, ttl_seconds=86400, negative_ttl_seconds=3600, read_only=False):
+        self.logging = logging
+        self.cache_file = cache_file
+        # A read-only cache is loaded but never written back
+        self.read_only = read_only
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.entries = {}
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def logINFO(self, message):
+        self.logging.info(f"[{self.__class__.__name__}] {message}")
+
+    def logERROR(self, message):
+        self.logging.error(f"[{self.__class__.__name__}] {message}")
+
+    def logWARNING(self, message):
+        self.logging.warning(f"[{self.__class__.__name__}] {message}")
+
+    def load(self):
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r') as file:
+                entries = json.load(file)
+        except (OSError, ValueError) as e:
+            self.logWARNING(f"Ignoring unreadable MX cache {self.cache_file}: {e}")
+            return
+        now = time.time()
+        self.entries = {domain: entry for domain, entry in entries.items() if entry['expires'] > now}
+        self.logINFO(f"Loaded {len(self.entries)} cached MX lookups from {self.cache_file}")
+
+    def get(self, domain):
+        with self.lock:
+            entry = self.entries.get(domain)
+        if entry and entry['expires'] > time.time():
+            return entry['mx']
+        return None
+
+    def put(self, domain, mx_hosts):
+        # Missing MX records are cached for a shorter time than found ones
+        ttl = self.ttl_seconds if mx_hosts else self.negative_ttl_seconds
+        with self.lock:
+            self.entries[domain] = {'mx': mx_hosts, 'expires': time.time() + ttl}
+            self.dirty = True
+
+    def save(self):
+        if not self.cache_file or not self.dirty or self.read_only:
+            return
+        temp_file = self.cache_file + '.tmp'
+        with self.lock:
+            entries = dict(self.entries)
+            self.dirty = False
+        with open(temp_file, 'w') as file:
+            json.dump(entries, file)
+        os.replace(temp_file, self.cache_file)
+
+
+class EmailAutoAddressValidator:
+    LOCAL_PART_PATTERN = r"[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+(?:\.[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+)*"
+    DOMAIN_PATTERN = r"(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+(?:[a-z]{2,63}|xn--[a-z0-9-]{1,59})"
+    LOCAL_PART_RE = re.compile(LOCAL_PART_PATTERN + r"\Z")
+    DOMAIN_RE = re.compile(DOMAIN_PATTERN + r"\Z")
+
+    def __init__(self, logging, resolver=None, mx_cache=None, lookup_workers=16, canary_domain=None):
+        self.logging = logging
+        # None skips MX lookups and validates syntax and IDNA only
+        self.resolver = resolver
+        self.mx_cache = mx_cache
+        self.lookup_workers = max(1, lookup_workers)
+        # A domain known to accept mail; if it cannot be resolved, DNS is treated as unavailable
+        self.canary_domain = canary_domain
+        self.total_addresses = 0
+        self.invalid_addresses = 0
+
+    def logINFO(self, message):
+        self.logging.info(f"[{self.__class__.__name__}] {message}")
+
+    def logERROR(self, message):
+        self.logging.error(f"[{self.__class__.__name__}] {message}")
+
+    def logWARNING(self, message):
+        self.logging.warning(f"[{self.__class__.__name__}] {message}")
+
+    def ascii_domain(self, domain):
+        # IDNA-encode internationalized domains; None when the domain cannot be encoded
+        domain = domain.strip().rstrip('.').lower()
+        try:
+            return domain.encode('idna').decode('ascii')
+        except UnicodeError:
+            return None
+
+    def check_syntax(self, email):
+        # Returns (delivery_status_code, reason, ascii domain); the code is None for a valid address
+        email = email.strip()
+        if len(email) > 254 or email.count('@') != 1:
+            return 'InvalidAddressSyntax', "Address must contain exactly one '@' and at most 254 characters.", None
+        local_part, domain = email.rsplit('@', 1)
+        if not local_part or len(local_part) > 64 or not self.LOCAL_PART_RE.match(local_part):
+            return 'InvalidAddressSyntax', f"Invalid local part '{local_part}'.", None
+        ascii_domain = self.ascii_domain(domain)
+        if not ascii_domain or len(ascii_domain) > 253 or not self.DOMAIN_RE.match(ascii_domain):
+            return 'InvalidAddressDomain', f"Invalid domain '{domain}'.", None
+        return None, '', ascii_domain
+
+    def lookup(self, domain):
+        if self.mx_cache:
+            cached = self.mx_cache.get(domain)
+            if cached is not None:
+                return cached
+        mx_hosts = self.resolver.resolve(domain)
+        if self.mx_cache:
+            self.mx_cache.put(domain, mx_hosts)
+        return mx_hosts
+
+    def lookup_domains(self, domains):
+        # Domains without MX; lookups that fail outright leave the domain unjudged
+        if self.canary_domain and self.canary_domain not in domains:
+            try:
+                if not self.lookup(self.canary_domain):
+                    raise EmailAutoMXLookupError(f"no MX for {self.canary_domain}")
+            except EmailAutoMXLookupError as e:
+                self.logWARNING(f"DNS looks unavailable ({e}); skipping MX checks for this run.")
+                return set()
+
+        def has_no_mx(domain):
+            try:
+                return domain if not self.lookup(domain) else None
+            except EmailAutoMXLookupError as e:
+                self.logWARNING(f"MX lookup for {domain} failed: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=self.lookup_workers) as executor:
+            return {domain for domain in executor.map(has_no_mx, sorted(domains)) if domain}
+
+    def failure_status(self, full_name, delivery_status_code, error_message):
+        return {
+            'FullName': full_name,
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'send_status': 'failure',
+            'delivery_status_code': delivery_status_code,
+            'retry_count': 0,
+            'error_message': error_message,
+            'delivery_duration': '0 seconds'
+        }
+
+    def validate_file(self, recipients_file, encoding=None):
+        # Syntax and IDNA over the whole list first, then one MX lookup per distinct domain
+        invalid = {}
+        domain_recipients = {}
+        self.total_addresses = 0
+        with open(recipients_file, 'r', newline='', encoding=encoding) as file:
+            for row in csv.DictReader(file):
+                email = (row.get('emailId') or '').strip()
+                full_name = row.get('fullName') or ''
+                self.total_addresses += 1
+                delivery_status_code, reason, ascii_domain = self.check_syntax(email)
+                if delivery_status_code:
+                    invalid[email] = self.failure_status(full_name, delivery_status_code, reason)
+                else:
+                    domain_recipients.setdefault(ascii_domain, []).append((email, full_name))
+        if self.resolver and domain_recipients:
+            if self.mx_cache:
+                self.mx_cache.load()
+            for domain in self.lookup_domains(domain_recipients):
+                for email, full_name in domain_recipients[domain]:
+                    invalid[email] = self.failure_status(full_name, 'NoMXRecord', f"Domain '{domain}' has no MX record.")
+            if self.mx_cache:
+                self.mx_cache.save()
+        self.invalid_addresses = len(invalid)
+        self.logINFO(f"Validated {self.total_addresses} addresses in {len(domain_recipients)} domains; "
+                     f"{self.invalid_addresses} invalid.")
+        return invalid
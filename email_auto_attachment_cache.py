@@ -0,0 +1,66 @@
+import base64
+import mmap
+import os
+import threading
+import logging
+from email import encoders
+from email.mime.application import MIMEApplication
+
+
+class EmailAutoAttachmentCache:
+    MMAP_THRESHOLD_BYTES = 1024 * 1024
+
+    def __init__(self, logging, mmap_threshold_bytes=MMAP_THRESHOLD_BYTES):
+        self.logging = logging
+        self.mmap_threshold_bytes = mmap_threshold_bytes
+        self.parts = {}
+        self.lock = threading.Lock()
+
+    def logINFO(self, message):
+        self.logging.info(f"[{self.__class__.__name__}] {message}")
+
+    def logERROR(self, message):
+        self.logging.error(f"[{self.__class__.__name__}] {message}")
+
+    def logWARNING(self, message):
+        self.logging.warning(f"[{self.__class__.__name__}] {message}")
+
+    def get_part(self, attachment_path):
+        # A changed file gets a new key, so edits to the attachment mid-run are picked up
+        stat = os.stat(attachment_path)
+        key = (os.path.abspath(attachment_path), stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            part = self.parts.get(key)
+            if part is None:
+                part = self.build_part(attachment_path, stat.st_size)
+                self.parts = {cached_key: cached_part for cached_key, cached_part in self.parts.items()
+                              if cached_key[0] != key[0]}
+                self.parts[key] = part
+        return part
+
+    def encode_file(self, attachment_path, size):
+        with open(attachment_path, 'rb') as file:
+            if size == 0:
+                return ''
+            if size < self.mmap_threshold_bytes:
+                data = file.read()
+            else:
+                # Map large files so the raw bytes are not held in memory next to the encoded copy
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                encoded = base64.encodebytes(data)
+                # Match email.encoders.encode_base64, which drops the newline it added itself
+                if data[-1] != 0x0a and encoded.endswith(b'\n'):
+                    encoded = encoded[:-1]
+                return encoded.decode('ascii')
+            finally:
+                if isinstance(data, mmap.mmap):
+                    data.close()
+
+    def build_part(self, attachment_path, size):
+        self.logINFO(f"Encoding attachment once for this run: {attachment_path} ({size} bytes)")
+        part = MIMEApplication(b'', Name=attachment_path, _encoder=encoders.encode_noop)
+        part.set_payload(self.encode_file(attachment_path, size))
+        part['Content-Transfer-Encoding'] = 'base64'
+        part['Content-Disposition'] = f'attachment; filename="{attachment_path}"'
+        return part
@@ -0,0 +1,243 @@
+import argparse
+import contextlib
+import csv
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+import logging
+from datetime import datetime
+
+from email_auto_csv_manager import EmailAutoCSVManager
+from email_auto_domain_blacklist import EmailAutoDomainBlacklist
+from email_auto_domain_email_counter import EmailAutoDomainEmailCounter
+from email_auto_email_stats import EmailAutoEmailStats
+from email_auto_pipeline import EmailAutoPipeline
+from email_auto_recipient_deduper import EmailAutoRecipientDeduper
+from email_auto_recipient_source import EmailAutoRecipientSource
+from email_auto_template_engine import EmailAutoTemplateEngine
+
+
+class EmailAutoBenchmark:
+    DEFAULT_SIZES = [10000, 100000, 1000000]
+    # Outcomes journalled by the record-and-write case; the rewrite at its end still covers every row
+    RECORD_SAMPLE = 10000
+    SEND_STATUSES = [('success', 'Delivered'), ('failure', 'UnknownError'), ('failure', 'DomainEmailLimitExceeded')]
+
+    def __init__(self, logging, sizes=None, work_directory=None, domains=500, duplicate_rate=0.05, seed=42):
+        self.logging = logging
+        self.sizes = sizes or self.DEFAULT_SIZES
+        self.work_directory = work_directory
+        self.domains = domains
+        self.duplicate_rate = duplicate_rate
+        self.seed = seed
+        self.results = []
+
+    def logINFO(self, message):
+        self.logging.info(f"[{self.__class__.__name__}] {message}")
+
+    def logERROR(self, message):
+        self.logging.error(f"[{self.__class__.__name__}] {message}")
+
+    def logWARNING(self, message):
+        self.logging.warning(f"[{self.__class__.__name__}] {message}")
+
+    def generate_files(self, directory, rows):
+        # Recipients with a share of repeated addresses, and a status file covering about half of them
+        generator = random.Random(self.seed)
+        recipients_file = os.path.join(directory, 'recipients.csv')
+        send_status_file = os.path.join(directory, 'recipients_SendStatus.csv')
+        blacklist_file = os.path.join(directory, 'blacklist_domains.txt')
+        with open(recipients_file, 'w', newline='') as recipients, open(send_status_file, 'w', newline='') as statuses:
+            recipients_writer = csv.writer(recipients)
+            status_writer = csv.writer(statuses)
+            recipients_writer.writerow(['fullName', 'emailId', 'company'])
+            status_writer.writerow(EmailAutoCSVManager.EMAIL_SEND_STATUS_FIELDS)
+            for index in range(rows):
+                if index and generator.random() < self.duplicate_rate:
+                    index = generator.randrange(index)
+                email = f"user{index}@domain{index % self.domains}.test"
+                full_name = f"First{index} Last{index}"
+                recipients_writer.writerow([full_name, email, f"Company {index % 997}"])
+                if index % 2 == 0:
+                    send_status, delivery_status_code = self.SEND_STATUSES[index % len(self.SEND_STATUSES)]
+                    status_writer.writerow([email, full_name, '2024-01-01 00:00:00', send_status, delivery_status_code,
+                                            0, '', '0 seconds'])
+        with open(blacklist_file, 'w') as file:
+            for index in range(0, self.domains, 50):
+                file.write(f"domain{index}.test\n")
+        return recipients_file, send_status_file, blacklist_file
+
+    def measure(self, case, rows, action, domains=None):
+        started_at = time.perf_counter()
+        try:
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                action()
+        except ImportError as e:
+            self.logWARNING(f"Skipping {case}: {e}")
+            self.results.append({'case': case, 'rows': rows, 'skipped': str(e)})
+            return
+        seconds = time.perf_counter() - started_at
+        result = {
+            'case': case,
+            'rows': rows,
+            'seconds': round(seconds, 4),
+            'rows_per_second': round(rows / seconds, 1) if seconds else None
+        }
+        label = f"{rows} rows"
+        # Cases that work on one entry per domain are labelled with the domain count as well
+        if domains is not None:
+            result['domains'] = domains
+            label += f", {domains} domains"
+        self.logINFO(f"{case} ({label}): {result['seconds']} seconds")
+        self.results.append(result)
+
+    def run_size(self, directory, rows):
+        recipients_file, send_status_file, blacklist_file = self.generate_files(directory, rows)
+        domain_email_count_file = os.path.join(directory, 'domainEmailCount.csv')
+        csv_manager = EmailAutoCSVManager(self.logging, send_status_file, domain_email_count_file)
+        self.measure('csv_manager.read_email_send_status', rows, csv_manager.read_email_send_status)
+        status_dict = csv_manager.email_send_status_dict
+
+        recorded_emails = list(status_dict)[:self.RECORD_SAMPLE]
+
+        def record_and_write():
+            for email in recorded_emails:
+                csv_manager.record_email_send_status(email, status_dict[email])
+            csv_manager.write_email_send_status()
+        self.measure('csv_manager.record_and_write_email_send_status', len(recorded_emails), record_and_write)
+
+        domain_email_counter = EmailAutoDomainEmailCounter(self.logging, None, domain_email_count_file,
+                                                           flush_every_updates=rows + 1)
+
+        def track_domain_email_count():
+            for row in EmailAutoRecipientSource(self.logging, recipients_file).iter_rows():
+                domain_email_counter.track_domain_email_count(row['emailId'])
+        self.measure('domain_email_counter.track_domain_email_count', rows, track_domain_email_count)
+        domains = len(domain_email_counter.snapshot())
+        self.measure('domain_email_counter.write_domain_email_count', rows, domain_email_counter.write_domain_email_count,
+                     domains)
+        self.measure('domain_email_counter.read_domain_email_count', rows,
+                     EmailAutoDomainEmailCounter(self.logging, None, domain_email_count_file).read_domain_email_count,
+                     domains)
+
+        def print_email_info():
+            email_stats = EmailAutoEmailStats(send_status_file, recipients_file, self.logging)
+            email_stats.print_email_info()
+        self.measure('email_stats.print_email_info', rows, print_email_info)
+
+        def dedupe_file():
+            deduper = EmailAutoRecipientDeduper(self.logging)
+            deduper.dedupe_file(recipients_file, os.path.join(directory, 'recipients_Deduped.csv'),
+                                os.path.join(directory, 'recipients_Duplicates.csv'))
+        self.measure('recipient_deduper.dedupe_file', rows, dedupe_file)
+
+        def count_duplicate_rows():
+            # pandas is optional here; the case is recorded as skipped when it is missing
+            from email_auto_repeated_elements_checker import RepeatedElementsChecker
+            RepeatedElementsChecker().count_duplicate_rows(recipients_file)
+        self.measure('repeated_elements_checker.count_duplicate_rows', rows, count_duplicate_rows)
+
+        def main_loop_dry_run():
+            # The executor's pipeline up to rendering, with delivery left out
+            domain_blacklist = EmailAutoDomainBlacklist(self.logging, blacklist_file)
+            domain_blacklist.read_blacklist_domains()
+            loop_counter = EmailAutoDomainEmailCounter(self.logging, None, os.path.join(directory, 'dryRunCount.csv'),
+                                                       flush_every_updates=rows + 1)
+            template_engine = EmailAutoTemplateEngine(self.logging, "Hello {{fullName|first_name}}",
+                                                      "Hi [Placeholder],\n\nA note for {{company}}.")
+            # Per-row skip warnings would otherwise dominate the timing
+            pipeline_logger = logging.getLogger('EmailAutoBenchmark.pipeline')
+            pipeline_logger.setLevel(logging.ERROR)
+            pipeline = EmailAutoPipeline(pipeline_logger, template_engine, domain_blacklist, loop_counter, rows,
+                                         status_dict)
+            pipeline.run(EmailAutoRecipientSource(self.logging, recipients_file).iter_rows(), 'dry_run')
+        self.measure('main_loop.dry_run', rows, main_loop_dry_run)
+
+    def run(self):
+        self.results = []
+        if self.work_directory:
+            os.makedirs(self.work_directory, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=self.work_directory) as work_directory:
+            for rows in self.sizes:
+                directory = os.path.join(work_directory, str(rows))
+                os.makedirs(directory)
+                self.logINFO(f"Benchmarking {rows} rows in {directory}")
+                self.run_size(directory, rows)
+        return self.report()
+
+    def git_commit(self):
+        try:
+            return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                  cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+        except OSError:
+            return None
+
+    def report(self):
+        return {
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'git_commit': self.git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': self.results
+        }
+
+    @staticmethod
+    def compare(baseline, current, max_regression, min_seconds=0.05):
+        # Cases that got slower than the baseline by more than max_regression (0.2 = 20%);
+        # cases faster than min_seconds are too noisy to flag
+        baseline_seconds = {(result['case'], result['rows']): result['seconds']
+                            for result in baseline['results'] if 'seconds' in result}
+        regressions = []
+        for result in current['results']:
+            previous = baseline_seconds.get((result['case'], result['rows']))
+            if 'seconds' not in result or not previous:
+                continue
+            change = (result['seconds'] - previous) / previous
+            result['change_vs_baseline'] = round(change, 4)
+            if change > max_regression and max(previous, result['seconds']) >= min_seconds:
+                regressions.append(result)
+        return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the state, dedupe and stats layers on synthetic data.")
+    parser.add_argument('--sizes', default=','.join(str(size) for size in EmailAutoBenchmark.DEFAULT_SIZES),
+                        help="Comma-separated row counts")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', default=None, help="Earlier results file to compare against")
+    parser.add_argument('--max-regression', type=float, default=0.2)
+    parser.add_argument('--min-seconds', type=float, default=0.05, help="Ignore changes in cases faster than this")
+    parser.add_argument('--work-dir', default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    benchmark = EmailAutoBenchmark(logging, sizes, args.work_dir, seed=args.seed)
+    report = benchmark.run()
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            regressions = EmailAutoBenchmark.compare(json.load(file), report, args.max_regression,
+                                                     args.min_seconds)
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    for result in report['results']:
+        if 'skipped' in result:
+            print(f"{result['case']:<50} {result['rows']:>9} rows  skipped ({result['skipped']})")
+            continue
+        change = f"  {result['change_vs_baseline']:+.1%}" if 'change_vs_baseline' in result else ''
+        domains = f"  ({result['domains']} domains)" if 'domains' in result else ''
+        print(f"{result['case']:<50} {result['rows']:>9} rows  {result['seconds']:>9.3f} s{change}{domains}")
+    print(f"Results written to {args.output}")
+    if regressions:
+        print(f"{len(regressions)} cases are more than {args.max_regression:.0%} slower than {args.baseline}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
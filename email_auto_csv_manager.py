@@ -1,16 +1,21 @@
 import csv
 import os
 import logging
+from email_auto_status_journal import EmailAutoStatusJournal
 
 class EmailAutoCSVManager:
     EMAIL_SEND_STATUS_FIELDS = ['emailId', 'FullName', 'timestamp', 'send_status', 'delivery_status_code', 'retry_count', 'error_message', 'delivery_duration']
     
-    def __init__(self, logging,email_send_status_file,domain_email_count_file):
+    def __init__(self, logging,email_send_status_file,domain_email_count_file,state_store=None):
         self.email_send_status_file = email_send_status_file
         self.domain_email_count_file = domain_email_count_file
         self.email_send_status_dict = {}
         self.domain_email_count = {}
         self.logging = logging
+        self.status_journal = EmailAutoStatusJournal(self.logging, self.email_send_status_file, self.EMAIL_SEND_STATUS_FIELDS)
+        # Optional EmailAutoSQLiteStore; the CSV file then becomes an export written on compaction
+        self.state_store = state_store
+        self.campaign = state_store.campaign_name(email_send_status_file) if state_store else None
 
     def logINFO(self, message):
         self.logging.info(f"[{self.__class__.__name__}] {message}")
@@ -21,50 +26,72 @@ class EmailAutoCSVManager:
     def logWARNING(self, message):
         self.logging.warning(f"[{self.__class__.__name__}] {message}")
 
-    def read_email_send_status(self):
+    def read_email_send_status(self, read_only=False):
+        # read_only (plan and dry-run passes): replay the journal into memory and leave every file untouched
+        if self.state_store:
+            self.logINFO(f"Reading email send status for campaign {self.campaign} from {self.state_store.db_file}")
+            self.email_send_status_dict.update(self.state_store.read_send_status(self.campaign))
+            if not self.email_send_status_dict:
+                self.import_email_send_status_file(read_only)
+            return self.email_send_status_dict
         try:
             self.logINFO("Reading email send status file...")
-            if not os.path.exists(self.email_send_status_file):
+            if not os.path.exists(self.email_send_status_file) and not read_only:
                 with open(self.email_send_status_file, 'w', newline='') as file:
                     writer = csv.writer(file)
                     writer.writerow(self.EMAIL_SEND_STATUS_FIELDS)
                     self.logINFO(f"Created new email send status file: {self.email_send_status_file}")
-            else:
-                with open(self.email_send_status_file, 'r') as file:
-                    reader = csv.DictReader(file)
-                    for row in reader:
-                        self.email_send_status_dict[row['emailId']] = {
-                            'FullName': row['FullName'],
-                            'timestamp': row['timestamp'],
-                            'send_status': row['send_status'],
-                            'delivery_status_code': row['delivery_status_code'],
-                            'retry_count': int(row['retry_count']),
-                            'error_message': row['error_message'],
-                            'delivery_duration': row['delivery_duration']
-                        }
-                self.logINFO(f"Successfully read email send status file: {self.email_send_status_file}")
+            self.status_journal.load(self.email_send_status_dict)
+            # Fold outcomes left over from an interrupted run back into the canonical CSV
+            if self.status_journal.pending_records and not read_only:
+                self.status_journal.compact(self.email_send_status_dict)
+            self.logINFO(f"Successfully read email send status file: {self.email_send_status_file}")
             return self.email_send_status_dict
         except (FileNotFoundError, PermissionError) as e:
             error_message = f"Error reading email send status file: {e}"
             self.logERROR(error_message)
 
+    def import_email_send_status_file(self, read_only=False):
+        # A campaign moving to the SQLite backend keeps its history: the CSV and journal are imported once
+        imported = self.status_journal.load({})
+        if imported:
+            self.logWARNING(f"No send status for campaign {self.campaign} in {self.state_store.db_file}; "
+                            f"importing {len(imported)} records from {self.email_send_status_file}")
+            if not read_only:
+                self.state_store.upsert_send_statuses(self.campaign, imported.items())
+            self.email_send_status_dict.update(imported)
+        return imported
+
+    def record_email_send_status(self, email, status):
+        try:
+            self.email_send_status_dict[email] = status
+            if self.state_store:
+                self.state_store.upsert_send_status(self.campaign, email, status)
+                return
+            self.status_journal.append(email, status)
+        except (FileNotFoundError, PermissionError) as e:
+            error_message = f"Error appending to email send status journal: {e}"
+            self.logERROR(error_message)
+
+    def compact_email_send_status(self):
+        try:
+            self.logINFO("Compacting email send status journal...")
+            if self.state_store:
+                self.state_store.export_send_status_file(self.campaign, self.email_send_status_file)
+                return
+            self.status_journal.compact(self.email_send_status_dict)
+        except (FileNotFoundError, PermissionError) as e:
+            error_message = f"Error compacting email send status journal: {e}"
+            self.logERROR(error_message)
+
     def write_email_send_status(self):
         try:
             self.logINFO("Writing to email send status file...")
-            with open(self.email_send_status_file, 'w', newline='') as file:
-                writer = csv.DictWriter(file, fieldnames=self.EMAIL_SEND_STATUS_FIELDS)
-                writer.writeheader()
-                for email, data in self.email_send_status_dict.items():
-                    writer.writerow({
-                        'FullName': data['FullName'],
-                        'emailId': email,
-                        'timestamp': data['timestamp'],
-                        'send_status': data['send_status'],
-                        'delivery_status_code': data['delivery_status_code'],
-                        'retry_count': data['retry_count'],
-                        'error_message': data['error_message'],
-                        'delivery_duration': data['delivery_duration']
-                    })
+            if self.state_store:
+                self.state_store.upsert_send_statuses(self.campaign, self.email_send_status_dict.items())
+                self.state_store.export_send_status_file(self.campaign, self.email_send_status_file)
+            else:
+                self.status_journal.compact(self.email_send_status_dict)
             self.logINFO(f"Successfully wrote to email send status file: {self.email_send_status_file}")
         except (FileNotFoundError, PermissionError) as e:
             error_message = f"Error writing email send status file: {e}"
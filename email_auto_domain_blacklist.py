@@ -1,9 +1,18 @@
 import logging
 
 class EmailAutoDomainBlacklist:
-    def __init__(self, logging, blacklist_file):
+    # Rule kinds stored on a trie node under None; labels are always strings, even empty ones ('a..b')
+    EXACT = 1
+    SUBDOMAINS = 2
+    RULE_KEY = None
+
+    def __init__(self, logging, blacklist_file, state_store=None):
         self.blacklist_file = blacklist_file
         self.logging = logging
+        self.state_store = state_store
+        # Reversed-label trie: 'mail.example.com' is stored under com -> example -> mail
+        self.trie = {}
+        self.rule_count = 0
 
     def logINFO(self, message):
         self.logging.info(f"[{self.__class__.__name__}] {message}")
@@ -14,12 +23,76 @@ class EmailAutoDomainBlacklist:
     def logWARNING(self, message):
         self.logging.warning(f"[{self.__class__.__name__}] {message}")
 
+    @staticmethod
+    def labels(domain):
+        return domain.strip().lower().strip('.').split('.')[::-1]
+
+    def parse_rule(self, rule):
+        # example.com   -> example.com and every subdomain
+        # =example.com  -> example.com only
+        # *.example.com -> subdomains of example.com only (".example.com" is accepted too)
+        rule = rule.strip().lower()
+        if rule.startswith('='):
+            return rule[1:].strip(), self.EXACT
+        if rule.startswith('*.'):
+            return rule[2:], self.SUBDOMAINS
+        if rule.startswith('.'):
+            return rule[1:], self.SUBDOMAINS
+        return rule, self.EXACT | self.SUBDOMAINS
+
+    def add_domain(self, rule):
+        if not rule or not rule.strip() or rule.lstrip().startswith('#'):
+            return False
+        domain, kind = self.parse_rule(rule)
+        if not domain:
+            return False
+        node = self.trie
+        for label in self.labels(domain):
+            node = node.setdefault(label, {})
+        previous_kind = node.get(self.RULE_KEY, 0)
+        if previous_kind & kind == kind:
+            return False
+        node[self.RULE_KEY] = previous_kind | kind
+        self.rule_count += 1
+        return True
+
+    def on_domain_blacklisted(self, domain):
+        # Listener for EmailAutoDomainEmailCounter so domains blacklisted mid-run apply immediately
+        if self.add_domain(domain):
+            self.logINFO(f"Blacklisted {domain} for the rest of this run.")
+
+    def is_blacklisted(self, domain):
+        labels = self.labels(domain)
+        node = self.trie
+        for depth, label in enumerate(labels):
+            node = node.get(label)
+            if node is None:
+                return False
+            kind = node.get(self.RULE_KEY, 0)
+            if depth == len(labels) - 1:
+                return bool(kind & self.EXACT)
+            if kind & self.SUBDOMAINS:
+                return True
+        return False
+
     def read_blacklist_domains(self):
+        if self.state_store:
+            self.logINFO("Reading blacklist from state database...")
+            rules = self.state_store.read_blacklist_domains()
+            for rule in rules:
+                self.add_domain(rule)
+            self.logINFO(f"Indexed {self.rule_count} blacklist rules.")
+            return rules
         try:
             self.logINFO("Reading blacklist file...")
+            blacklist_domains = set()
             with open(self.blacklist_file, 'r') as file:
-                blacklist_domains = {line.strip() for line in file}
-            self.logINFO("Successfully read blacklist file.")
+                for line in file:
+                    rule = line.strip()
+                    if rule:
+                        blacklist_domains.add(rule)
+                        self.add_domain(rule)
+            self.logINFO(f"Successfully read blacklist file; indexed {self.rule_count} rules.")
             return blacklist_domains
         except (FileNotFoundError, PermissionError) as e:
             error_message = f"Error reading blacklist file: {e}"
@@ -1,6 +1,10 @@
+import atexit
 import csv
 import os
-from datetime import datetime
+import signal
+import threading
+import time
+from datetime import datetime, timedelta
 import logging
 
 class EmailAutoDomainEmailCounter:
@@ -8,8 +12,24 @@ class EmailAutoDomainEmailCounter:
     DOMAIN_EMAIL_COUNT_FILE = 'domainEmailCount.csv'
     BLACKLIST_FILE = 'blacklist_domains.txt'  # File to store blacklisted domains
 
-    def __init__(self, logging):
+    def __init__(self, logging, state_store=None, domain_email_count_file=None, flush_interval_seconds=30, flush_every_updates=50,
+                 blacklist_file=None):
         self.logging = logging
+        self.state_store = state_store
+        self.blacklist_file = blacklist_file or self.BLACKLIST_FILE
+        self.blacklist_listeners = []
+        self.domain_email_count_file = domain_email_count_file or self.DOMAIN_EMAIL_COUNT_FILE
+        self.flush_interval_seconds = flush_interval_seconds
+        self.flush_every_updates = flush_every_updates
+        # In-memory counts keyed by (domain, day); the file is only a periodic snapshot of this
+        self.domain_email_count = {}
+        self.pending_updates = 0
+        self.last_flush_at = time.monotonic()
+        self.current_day = None
+        self.next_rollover_at = 0.0
+        self.lock = threading.RLock()
+        self.flush_timer = None
+        self.flush_timer_stop = threading.Event()
 
     def logINFO(self, message):
         self.logging.info(f"[{self.__class__.__name__}] {message}")
@@ -23,41 +43,79 @@ class EmailAutoDomainEmailCounter:
     def start_action(self, action_name):
         log_message = f"Starting {action_name}..."
         self.logINFO(log_message)
-        print(log_message)
 
     def action_done(self, action_name):
         log_message = f"{action_name} completed successfully."
         self.logINFO(log_message)
-        print(log_message)
 
     def action_failed(self, action_name, error_message):
         log_message = f"{action_name} failed: {error_message}"
         self.logERROR(log_message)
-        print(log_message)
+
+    def today(self):
+        # Recompute the date string only when the clock passes midnight, not once per message
+        if time.time() >= self.next_rollover_at:
+            now = datetime.now()
+            self.current_day = now.strftime('%Y-%m-%d')
+            midnight = datetime(now.year, now.month, now.day) + timedelta(days=1)
+            self.next_rollover_at = midnight.timestamp()
+            with self.lock:
+                stale_keys = [key for key in self.domain_email_count if key[1] < self.current_day]
+                for key in stale_keys:
+                    del self.domain_email_count[key]
+            if stale_keys:
+                self.logINFO(f"Day rolled over to {self.current_day}; dropped {len(stale_keys)} stale domain counts.")
+        return self.current_day
 
     def read_domain_email_count(self):
-        domain_email_count = {}
-        try:
-            self.start_action("reading domain email count file")
-            if os.path.exists(EmailAutoDomainEmailCounter.DOMAIN_EMAIL_COUNT_FILE):
-                with open(EmailAutoDomainEmailCounter.DOMAIN_EMAIL_COUNT_FILE, 'r') as file:
-                    reader = csv.DictReader(file)
-                    for row in reader:
-                        domain_email_count[row['domain']] = {
-                            'date': row['date'],
-                            'count': int(row['count'])
-                        }
-                self.action_done("reading domain email count file")
-            else:
-                self.logINFO("Domain email count file not found.")
-        except (FileNotFoundError, PermissionError) as e:
-            self.action_failed("reading domain email count file", str(e))
-        return domain_email_count
+        rows = {}
+        if self.state_store:
+            self.start_action("reading domain email count from state database")
+            rows = self.state_store.read_domain_email_count()
+            self.action_done("reading domain email count from state database")
+        else:
+            try:
+                self.start_action("reading domain email count file")
+                if os.path.exists(self.domain_email_count_file):
+                    with open(self.domain_email_count_file, 'r') as file:
+                        reader = csv.DictReader(file)
+                        for row in reader:
+                            rows[row['domain']] = {
+                                'date': row['date'],
+                                'count': int(row['count'])
+                            }
+                    self.action_done("reading domain email count file")
+                else:
+                    self.logINFO("Domain email count file not found.")
+            except (FileNotFoundError, PermissionError) as e:
+                self.action_failed("reading domain email count file", str(e))
+        with self.lock:
+            for domain, data in rows.items():
+                self.domain_email_count[(domain, data['date'])] = data['count']
+        self.today()
+        return self.domain_email_count
 
-    def write_domain_email_count(self, domain_email_count):
+    def snapshot(self):
+        # Latest day per domain, the layout of domainEmailCount.csv and the state store table
+        latest = {}
+        with self.lock:
+            for (domain, day), count in self.domain_email_count.items():
+                if domain not in latest or day > latest[domain]['date']:
+                    latest[domain] = {'date': day, 'count': count}
+        return latest
+
+    def write_domain_email_count(self):
+        domain_email_count = self.snapshot()
+        with self.lock:
+            self.pending_updates = 0
+            self.last_flush_at = time.monotonic()
+        if self.state_store:
+            self.state_store.write_domain_email_count(domain_email_count)
+            return
         try:
             self.start_action("writing to domain email count file")
-            with open(EmailAutoDomainEmailCounter.DOMAIN_EMAIL_COUNT_FILE, 'w', newline='') as file:
+            temp_file = self.domain_email_count_file + '.tmp'
+            with open(temp_file, 'w', newline='') as file:
                 writer = csv.DictWriter(file, fieldnames=EmailAutoDomainEmailCounter.DOMAIN_EMAIL_COUNT_FIELDS)
                 writer.writeheader()
                 for domain, data in domain_email_count.items():
@@ -66,38 +124,96 @@ class EmailAutoDomainEmailCounter:
                         'date': data['date'],
                         'count': data['count']
                     })
+            os.replace(temp_file, self.domain_email_count_file)
             self.action_done("writing to domain email count file")
         except (FileNotFoundError, PermissionError) as e:
             self.action_failed("writing to domain email count file", str(e))
 
-    def track_domain_email_count(self, email_send_status_dict, recipient_email, domain_email_count):
+    def maybe_flush(self):
+        with self.lock:
+            due = self.pending_updates and (
+                self.pending_updates >= self.flush_every_updates
+                or time.monotonic() - self.last_flush_at >= self.flush_interval_seconds)
+        if due:
+            self.write_domain_email_count()
+
+    def flush(self):
+        with self.lock:
+            dirty = self.pending_updates > 0
+        if dirty:
+            self.write_domain_email_count()
+
+    def start_flush_timer(self):
+        # maybe_flush() otherwise only runs on an update, so counts could sit unwritten while sends are slow
+        if self.flush_timer or self.flush_interval_seconds <= 0:
+            return
+        self.flush_timer_stop.clear()
+
+        def run():
+            while not self.flush_timer_stop.wait(self.flush_interval_seconds):
+                self.maybe_flush()
+
+        self.flush_timer = threading.Thread(target=run, name='domain-count-flush', daemon=True)
+        self.flush_timer.start()
+
+    def stop_flush_timer(self):
+        if self.flush_timer:
+            self.flush_timer_stop.set()
+            self.flush_timer.join()
+            self.flush_timer = None
+
+    def install_shutdown_hooks(self):
+        # Never lose buffered counts: flush on normal exit and on SIGTERM
+        atexit.register(self.flush)
+        if threading.current_thread() is not threading.main_thread():
+            return
+        previous_handler = signal.getsignal(signal.SIGTERM)
+
+        def handle_sigterm(signum, frame):
+            self.flush()
+            if callable(previous_handler):
+                previous_handler(signum, frame)
+            else:
+                raise SystemExit(128 + signum)
+
+        signal.signal(signal.SIGTERM, handle_sigterm)
+
+    def get_count(self, domain):
+        return self.domain_email_count.get((domain, self.today()), 0)
+
+    def track_domain_email_count(self, recipient_email):
         domain = recipient_email.split('@')[-1]
-        today = datetime.now().strftime('%Y-%m-%d')
-        if domain not in domain_email_count:
-            domain_email_count[domain] = {'date': today, 'count': 1}
-        elif domain_email_count[domain]['date'] != today:
-            domain_email_count[domain] = {'date': today, 'count': 1}
-        else:
-            domain_email_count[domain]['count'] += 1
-        return domain_email_count
+        key = (domain, self.today())
+        with self.lock:
+            count = self.domain_email_count.get(key, 0) + 1
+            self.domain_email_count[key] = count
+            self.pending_updates += 1
+        self.maybe_flush()
+        return count
 
-    def is_domain_limit_exceeded(self, domain_email_count, recipient_email, domain_limit):
+    def is_domain_limit_exceeded(self, recipient_email, domain_limit):
         domain = recipient_email.split('@')[-1]
-        today = datetime.now().strftime('%Y-%m-%d')
-        if domain in domain_email_count and domain_email_count[domain]['date'] == today and domain_email_count[domain]['count'] > domain_limit:
-            return True
-        return False
-    
+        return self.get_count(domain) > domain_limit
+
+    def add_blacklist_listener(self, listener):
+        self.blacklist_listeners.append(listener)
+
     def add_to_blacklist(self, domain):
+        for listener in self.blacklist_listeners:
+            listener(domain)
+        if self.state_store:
+            self.state_store.add_blacklist_domains([domain])
+            self.logINFO(f"Added {domain} to blacklist in state database.")
+            return
         try:
             self.start_action("adding domain to blacklist")
-            with open(self.BLACKLIST_FILE, 'a') as file:
+            with open(self.blacklist_file, 'a') as file:
                 file.write(domain + '\n')
             self.action_done("adding domain to blacklist")
         except Exception as e:
             self.action_failed("adding domain to blacklist", str(e))
 
-    def check_and_blacklist_domain(self, recipient_email, domain_email_count, domain_limit):
+    def check_and_blacklist_domain(self, recipient_email, domain_limit):
         domain = recipient_email.split('@')[-1]
-        if domain in domain_email_count and domain_email_count[domain]['count'] == domain_limit+1:
+        if self.get_count(domain) == domain_limit+1:
             self.add_to_blacklist(domain)
@@ -0,0 +1,68 @@
+import heapq
+import itertools
+import logging
+from collections import OrderedDict, deque
+
+
+class EmailAutoDomainInterleaver:
+    def __init__(self, logging, domain_email_counter=None, domain_limit=None):
+        self.logging = logging
+        self.domain_email_counter = domain_email_counter
+        self.domain_limit = domain_limit
+        self.sequence = itertools.count()
+
+    def logINFO(self, message):
+        self.logging.info(f"[{self.__class__.__name__}] {message}")
+
+    def logERROR(self, message):
+        self.logging.error(f"[{self.__class__.__name__}] {message}")
+
+    def logWARNING(self, message):
+        self.logging.warning(f"[{self.__class__.__name__}] {message}")
+
+    def remaining_quota(self, item, pending):
+        # Sends left today for the item's domain; without a limit every pending row counts
+        if self.domain_email_counter is None or self.domain_limit is None:
+            return pending
+        domain = item['email'].split('@')[-1]
+        return max(0, self.domain_limit - self.domain_email_counter.get_count(domain))
+
+    def reorder(self, items):
+        # Rows that are already decided pass straight through; the rest are held per domain, in file order
+        domains = OrderedDict()
+        for item in items:
+            if item['action'] is not None:
+                yield item
+                continue
+            domains.setdefault(item['domain'], deque()).append(item)
+        # Heap of (-remaining quota, sequence, domain): the domain with the most sends left goes next,
+        # and the sequence rotates domains with equal quota round-robin
+        heap = []
+        over_limit = []
+        for domain, queue in domains.items():
+            remaining = self.remaining_quota(queue[0], len(queue))
+            if remaining:
+                heap.append((-remaining, next(self.sequence), domain))
+            else:
+                over_limit.append(queue)
+        heapq.heapify(heap)
+        in_quota_count = 0
+        while heap:
+            remaining, _, domain = heapq.heappop(heap)
+            queue = domains[domain]
+            yield queue.popleft()
+            in_quota_count += 1
+            remaining += 1
+            if not queue:
+                continue
+            if remaining:
+                heapq.heappush(heap, (remaining, next(self.sequence), domain))
+            else:
+                over_limit.append(queue)
+        # Rows past a domain's limit go last, so they can no longer hold up domains with quota left
+        over_limit_count = 0
+        for queue in over_limit:
+            over_limit_count += len(queue)
+            yield from queue
+        self.logINFO(f"Interleaved {in_quota_count} recipients across {len(domains)} domains; "
+                     f"{over_limit_count} over today's domain limit moved to the end.")
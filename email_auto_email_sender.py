@@ -2,31 +2,49 @@ import smtplib
 import logging
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from email.mime.application import MIMEApplication
 from datetime import datetime
 import time
 
 from email_auto_domain_email_counter import EmailAutoDomainEmailCounter
+from email_auto_smtp_pool import EmailAutoSMTPPool
+from email_auto_attachment_cache import EmailAutoAttachmentCache
 
 class EmailAutoEmailSender:
     RETRY_MINUTES=120
     NEXT_WAIT=10
-    def __init__(self, logging, sender_email, sender_password):
+    SMTP_HOST='smtp.mail.yahoo.com'
+    SMTP_PORT=465
+    # Provider replies that mean the sending account hit its own limit rather than a recipient problem
+    QUOTA_SMTP_CODES=(421, 450, 451, 452, 550, 552, 554)
+    QUOTA_MARKERS=('quota', 'limit', 'too many')
+    def __init__(self, logging, sender_email, sender_password, smtp_pool=None, rate_scheduler=None, attachment_cache=None,
+                 domain_email_counter=None, sender_accounts=None, metrics=None):
         self.sender_email = sender_email
         self.sender_password = sender_password
         self.logging = logging
-        self.eadEmailCounterObj = EmailAutoDomainEmailCounter(self.logging)
+        self.eadEmailCounterObj = domain_email_counter or EmailAutoDomainEmailCounter(self.logging)
+        # Keep authenticated SMTP sessions open across messages
+        if smtp_pool is None:
+            smtp_pool = EmailAutoSMTPPool(self.logging, self.SMTP_HOST, self.SMTP_PORT, sender_email, sender_password)
+        self.smtp_pool = smtp_pool
+        # Token-bucket pacing replaces the fixed NEXT_WAIT/RETRY_MINUTES sleeps when a scheduler is given
+        self.rate_scheduler = rate_scheduler
+        # Encode each attachment once per run and reuse the MIME part for every message
+        if attachment_cache is None:
+            attachment_cache = EmailAutoAttachmentCache(self.logging)
+        self.attachment_cache = attachment_cache
+        # Optional rotation over several sender identities, each with its own SMTP pool and quota
+        self.sender_accounts = sender_accounts
+        # Optional EmailAutoMetrics receiving per-stage timings
+        self.metrics = metrics
     
     def wait_and_retry(self, wait_time_seconds):
         self.logINFO(f"Waiting for {wait_time_seconds} seconds before retrying...")
-        print(f"Waiting for {wait_time_seconds} seconds before retrying...")
         time.sleep(wait_time_seconds)
         self.logINFO("Retry initiated.")
-        print("Retry initiated.")
 
     def wait_and_next(self, wait_time_seconds):
         self.logINFO(f"Waiting for {wait_time_seconds} seconds before Next...")
-        print(f"Waiting for {wait_time_seconds} seconds before Next...")
         time.sleep(wait_time_seconds)
 
     def logINFO(self, message):
@@ -41,58 +59,118 @@ class EmailAutoEmailSender:
     def start_action(self, action_name):
         log_message = f"Starting {action_name}..."
         self.logINFO(log_message)
-        print(log_message)
 
     def action_done(self, action_name):
         log_message = f"{action_name} completed successfully."
         self.logINFO(log_message)
-        print(log_message)
 
     def action_failed(self, action_name, error_message):
         log_message = f"{action_name} failed: {error_message}"
         self.logERROR(log_message)
-        print(log_message)
 
-    def send_email(self, recipient_email, full_name, subject, body, attachment_path, domain_email_count, domain_limit):
+    def send_email(self, recipient_email, full_name, subject, body, attachment_path, domain_limit):
+        self.start_action("sending email")
+        status = self.check_domain_limit(recipient_email, full_name, domain_limit)
+        if status:
+            return status
+        if self.rate_scheduler:
+            self.rate_scheduler.acquire(recipient_email.split('@')[-1])
+        status = self.deliver_email(recipient_email, full_name, subject, body, attachment_path)
+        if status['send_status'] == 'success':
+            self.eadEmailCounterObj.maybe_flush()
+        self.pause_after(status, recipient_email)
+        return status
+
+    def check_domain_limit(self, recipient_email, full_name, domain_limit):
+        if not self.eadEmailCounterObj.is_domain_limit_exceeded(recipient_email, domain_limit):
+            return None
+        domain = recipient_email.split('@')[-1]
+        error_message = f"Domain Email Limit Exceeded for {domain}. Limit: {domain_limit}/day."
+        self.logERROR(error_message)
+        return {
+            'FullName': full_name,
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'send_status': 'failure',
+            'delivery_status_code': 'DomainEmailLimitExceeded',
+            'retry_count': 0,
+            'error_message': error_message,
+            'delivery_duration': '0 seconds'
+        }
+
+    def pause_after(self, status, recipient_email=None):
+        if self.sender_accounts and status['delivery_status_code'] in self.sender_accounts.COOLDOWN_CODES + ('SenderQuotaExhausted',):
+            # Only the failing account is cooled down; the others keep sending
+            return
+        if self.rate_scheduler:
+            if status['delivery_status_code'] == 'SMTPAuthenticationError':
+                self.rate_scheduler.backoff_all()
+            elif status['delivery_status_code'] != 'Delivered' and recipient_email:
+                self.rate_scheduler.backoff(recipient_email.split('@')[-1])
+            return
+        if status['delivery_status_code'] == 'Delivered':
+            self.wait_and_next(self.NEXT_WAIT)
+        else:
+            self.wait_and_retry(self.RETRY_MINUTES)
+
+    def deliver_email(self, recipient_email, full_name, subject, body, attachment_path):
+        if not self.sender_accounts:
+            return self.deliver_through(self.smtp_pool, self.sender_email, recipient_email, full_name, subject, body,
+                                        attachment_path)
+        # An account that fails auth or hits its provider quota is cooled down; retry the message on another one
+        for attempt in range(max(1, len(self.sender_accounts.accounts))):
+            account = self.sender_accounts.acquire()
+            if account is None:
+                error_message = "Every sender account has used its daily quota."
+                self.action_failed("sending email", error_message)
+                return self.handle_send_error(recipient_email, full_name, error_message, 'SenderQuotaExhausted')
+            status = {'delivery_status_code': 'UnknownError'}
+            try:
+                status = self.deliver_through(account.smtp_pool, account.sender_email, recipient_email, full_name,
+                                              subject, body, attachment_path)
+            finally:
+                self.sender_accounts.release(account, status)
+            if status['delivery_status_code'] not in self.sender_accounts.COOLDOWN_CODES:
+                break
+        status['retry_count'] = attempt
+        return status
+
+    def is_quota_error(self, error):
+        if error.smtp_code not in self.QUOTA_SMTP_CODES:
+            return False
+        text = error.smtp_error.decode('utf-8', 'replace') if isinstance(error.smtp_error, bytes) else str(error.smtp_error)
+        return any(marker in text.lower() for marker in self.QUOTA_MARKERS)
+
+    def deliver_through(self, smtp_pool, sender_email, recipient_email, full_name, subject, body, attachment_path):
+        started_at = time.perf_counter()
+        status = self.send_through(smtp_pool, sender_email, recipient_email, full_name, subject, body, attachment_path)
+        delivery_seconds = time.perf_counter() - started_at
+        status['delivery_duration'] = f"{delivery_seconds:.3f} seconds"
+        if self.metrics:
+            self.metrics.observe('delivery', delivery_seconds)
+        return status
+
+    def send_through(self, smtp_pool, sender_email, recipient_email, full_name, subject, body, attachment_path):
         try:
-            self.start_action("sending email")
-            if self.eadEmailCounterObj.is_domain_limit_exceeded(domain_email_count, recipient_email, domain_limit):
-                domain = recipient_email.split('@')[-1]
-                error_message = f"Domain Email Limit Exceeded for {domain}. Limit: {domain_limit}/day."
-                self.logERROR(error_message)
-                print(error_message)
-                return {
-                    'FullName': full_name,
-                    'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    'send_status': 'failure',
-                    'delivery_status_code': 'DomainEmailLimitExceeded',
-                    'retry_count': 0,
-                    'error_message': error_message,
-                    'delivery_duration': '0 seconds'
-                }
-                
+            started_at = time.perf_counter()
             message = MIMEMultipart('alternative')
-            message['From'] = self.sender_email
+            message['From'] = sender_email
             message['To'] = recipient_email
             message['Subject'] = subject
             message.attach(MIMEText(body, 'plain'))
+            if self.metrics:
+                self.metrics.observe('mime_build', time.perf_counter() - started_at)
 
             if attachment_path:
-                with open(attachment_path, 'rb') as file:
-                    part = MIMEApplication(file.read(), Name=attachment_path)
-                part['Content-Disposition'] = f'attachment; filename="{attachment_path}"'
-                message.attach(part)
+                started_at = time.perf_counter()
+                message.attach(self.attachment_cache.get_part(attachment_path))
+                if self.metrics:
+                    self.metrics.observe('attachment_encode', time.perf_counter() - started_at)
 
-            with smtplib.SMTP_SSL('smtp.mail.yahoo.com', 465) as server:
-                server.login(self.sender_email, self.sender_password)
-                server.send_message(message)
+            smtp_pool.send_message(message)
 
             self.action_done("sending email")
             timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
-            self.eadEmailCounterObj.write_domain_email_count(domain_email_count)
-            self.wait_and_next(self.NEXT_WAIT)
-
             return {
                 'FullName': full_name,
                 'timestamp': timestamp,
@@ -105,27 +183,34 @@ class EmailAutoEmailSender:
         except smtplib.SMTPAuthenticationError as e:
             error_message = f"SMTP authentication error: {e}"
             self.action_failed("sending email", error_message)
-            self.wait_and_retry(self.RETRY_MINUTES)
-            return self.handle_send_error(recipient_email, full_name, error_message)
+            return self.handle_send_error(recipient_email, full_name, error_message, 'SMTPAuthenticationError')
+        except smtplib.SMTPResponseException as e:
+            error_message = f"SMTP error: {e}"
+            self.action_failed("sending email", error_message)
+            delivery_status_code = 'SMTPQuotaExceeded' if self.is_quota_error(e) else 'UnknownError'
+            return self.handle_send_error(recipient_email, full_name, error_message, delivery_status_code)
         except smtplib.SMTPException as e:
             error_message = f"SMTP error: {e}"
             self.action_failed("sending email", error_message)
-            self.wait_and_retry(self.RETRY_MINUTES)
             return self.handle_send_error(recipient_email, full_name, error_message)
         except Exception as e:
             error_message = f"Error sending email to {recipient_email}: {e}"
             self.action_failed("sending email", error_message)
-            self.wait_and_retry(self.RETRY_MINUTES)
             return self.handle_send_error(recipient_email, full_name, error_message)
 
-    def handle_send_error(self, recipient_email, full_name, error_message):
+    def close(self):
+        self.smtp_pool.close()
+        if self.sender_accounts:
+            self.sender_accounts.close()
+
+    def handle_send_error(self, recipient_email, full_name, error_message, delivery_status_code='UnknownError'):
         self.logERROR(error_message)
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         return {
             'FullName': full_name,
             'timestamp': timestamp,
             'send_status': 'failure',
-            'delivery_status_code': 'UnknownError',
+            'delivery_status_code': delivery_status_code,
             'retry_count': 0,
             'error_message': error_message,
             'delivery_duration': '0 seconds'
@@ -1,39 +1,79 @@
 import csv
+from collections import Counter, defaultdict
 
 class EmailAutoEmailStats:
-    def __init__(self, email_send_status_file, recipients_file,logging):
+    def __init__(self, email_send_status_file, recipients_file,logging, recipients_file_encoding=None):
         self.email_send_status_file = email_send_status_file
         self.recipients_file = recipients_file
+        self.recipients_file_encoding = recipients_file_encoding
         self.successEmailsCount=0
         self.logging=logging
+        self.loaded = False
+        self.total_emails = 0
+        self.status_counts = Counter()
+        self.delivery_status_code_counts = Counter()
+        self.domain_counts = defaultdict(Counter)
 
-    def get_failed_emails(self):
-        failed_emails = 0
-        with open(self.email_send_status_file, 'r') as file:
+    def load(self, email_send_status_dict=None):
+        # One pass over each source; afterwards counters are kept current by record_outcome
+        self.status_counts.clear()
+        self.delivery_status_code_counts.clear()
+        self.domain_counts.clear()
+        if email_send_status_dict is not None:
+            rows = ((email, data['send_status'], data['delivery_status_code'])
+                    for email, data in email_send_status_dict.items())
+            self.count_rows(rows)
+        else:
+            with open(self.email_send_status_file, 'r') as file:
+                reader = csv.DictReader(file)
+                self.count_rows((row['emailId'], row['send_status'], row['delivery_status_code']) for row in reader)
+        with open(self.recipients_file, 'r', encoding=self.recipients_file_encoding) as file:
             reader = csv.DictReader(file)
-            for row in reader:
-                if row['send_status'] == 'failure':
-                    failed_emails += 1
-        return failed_emails
+            self.total_emails = sum(1 for row in reader)
+        self.loaded = True
+
+    def count_rows(self, rows):
+        for email, send_status, delivery_status_code in rows:
+            self.add(email, send_status, delivery_status_code, 1)
+
+    def add(self, email, send_status, delivery_status_code, delta):
+        domain = email.split('@')[-1]
+        self.status_counts[send_status] += delta
+        self.delivery_status_code_counts[delivery_status_code] += delta
+        self.domain_counts[domain][send_status] += delta
+
+    def record_outcome(self, recipient_email, status, previous_status=None):
+        if not self.loaded:
+            return
+        if previous_status:
+            self.add(recipient_email, previous_status['send_status'], previous_status['delivery_status_code'], -1)
+        self.add(recipient_email, status['send_status'], status['delivery_status_code'], 1)
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+    def get_failed_emails(self):
+        self.ensure_loaded()
+        return self.status_counts['failure']
 
     def get_total_emails(self):
-        total_emails = 0
-        with open(self.recipients_file, 'r') as file:
-            reader = csv.DictReader(file)
-            total_emails = sum(1 for row in reader)
-        return total_emails
+        self.ensure_loaded()
+        return self.total_emails
 
     def get_pending_emails(self):
-        total_emails = self.get_total_emails()
-        sent_emails = 0
-        with open(self.email_send_status_file, 'r') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                if row['send_status'] == 'success':
-                    sent_emails += 1
-        pending_emails = total_emails-sent_emails
-        self.successEmailsCount=sent_emails
-        return pending_emails
+        self.ensure_loaded()
+        self.successEmailsCount=self.status_counts['success']
+        return self.total_emails-self.successEmailsCount
+
+    def get_delivery_status_code_breakdown(self):
+        self.ensure_loaded()
+        return {code: count for code, count in self.delivery_status_code_counts.items() if count}
+
+    def get_domain_breakdown(self):
+        self.ensure_loaded()
+        return {domain: {status: count for status, count in counts.items() if count}
+                for domain, counts in self.domain_counts.items() if any(counts.values())}
 
     def print_email_info(self):
         total_emails = self.get_total_emails()
@@ -45,8 +85,16 @@ class EmailAutoEmailStats:
         self.logging.info(f"Failed emails: {failed_emails}")
         print(f"Pending emails: {pending_emails}")
         self.logging.info(f"Pending emails: {pending_emails}")
+        for code, count in sorted(self.get_delivery_status_code_breakdown().items()):
+            print(f"Delivery status {code}: {count}")
+            self.logging.info(f"Delivery status {code}: {count}")
+        for domain, counts in sorted(self.get_domain_breakdown().items()):
+            summary = ', '.join(f"{status}={count}" for status, count in sorted(counts.items()))
+            self.logging.info(f"Domain {domain}: {summary}")
 
     def success_emails_count(self):
+        if self.loaded:
+            self.successEmailsCount=self.status_counts['success']
         return self.successEmailsCount
 
 
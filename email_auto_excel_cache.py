@@ -0,0 +1,106 @@
+import glob
+import hashlib
+import os
+import pickle
+import logging
+
+
+class EmailAutoExcelCache:
+    # Pickles are only ever read from the user's own cache folder, never from a folder shipped with the data
+    CACHE_DIRECTORY = os.path.join(os.path.expanduser('~'), '.cache', 'email_automator', 'excel')
+    CACHE_VERSION = 1
+
+    def __init__(self, logging, cache_directory=None):
+        self.logging = logging
+        self.cache_directory = cache_directory or self.CACHE_DIRECTORY
+
+    def logINFO(self, message):
+        self.logging.info(f"[{self.__class__.__name__}] {message}")
+
+    def logERROR(self, message):
+        self.logging.error(f"[{self.__class__.__name__}] {message}")
+
+    def logWARNING(self, message):
+        self.logging.warning(f"[{self.__class__.__name__}] {message}")
+
+    @staticmethod
+    def file_sha256(file_path):
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def cache_prefix(self, file_path):
+        # Workbooks with the same name in different folders get their own entries in the shared folder
+        path_hash = hashlib.sha256(os.path.abspath(file_path).encode('utf-8')).hexdigest()[:8]
+        return f"{os.path.basename(file_path)}.{path_hash}"
+
+    def cache_file(self, file_path, sha256):
+        # Keyed by content hash, so an edited workbook never matches its old cache
+        return os.path.join(self.cache_directory, f"{self.cache_prefix(file_path)}.{sha256[:16]}.pickle")
+
+    def parse_workbook(self, file_path):
+        # Every sheet as a list of columns (header cell first), padded to the sheet's widest row
+        from openpyxl import load_workbook
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            sheets = []
+            for sheet_name in workbook.sheetnames:
+                rows = [tuple(row) for row in workbook[sheet_name].iter_rows(values_only=True)]
+                width = max((len(row) for row in rows), default=0)
+                columns = [[row[index] if index < len(row) else None for row in rows] for index in range(width)]
+                sheets.append((sheet_name, columns, len(rows)))
+            return sheets
+        finally:
+            workbook.close()
+
+    def write_cache(self, file_path, sha256, sheets):
+        cache_file = self.cache_file(file_path, sha256)
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        temp_file = cache_file + '.tmp'
+        with open(temp_file, 'wb') as file:
+            pickle.dump({'version': self.CACHE_VERSION, 'sha256': sha256, 'sheets': sheets}, file,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, cache_file)
+        # Drop caches of earlier versions of the same workbook
+        pattern = os.path.join(glob.escape(self.cache_directory), glob.escape(self.cache_prefix(file_path)) + '.*.pickle')
+        for stale_file in glob.glob(pattern):
+            if stale_file != cache_file:
+                os.remove(stale_file)
+
+    def read_cache(self, file_path, sha256):
+        cache_file = self.cache_file(file_path, sha256)
+        if not os.path.exists(cache_file):
+            return None
+        try:
+            with open(cache_file, 'rb') as file:
+                cached = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            self.logWARNING(f"Ignoring unreadable cache {cache_file}: {e}")
+            return None
+        if cached.get('version') != self.CACHE_VERSION or cached.get('sha256') != sha256:
+            return None
+        return cached['sheets']
+
+    def load_sheets(self, file_path):
+        sha256 = self.file_sha256(file_path)
+        sheets = self.read_cache(file_path, sha256)
+        if sheets is not None:
+            self.logINFO(f"Read {file_path} from the Excel cache.")
+            return sheets
+        self.logINFO(f"Parsing {file_path} and caching its sheets.")
+        sheets = self.parse_workbook(file_path)
+        try:
+            self.write_cache(file_path, sha256, sheets)
+        except OSError as e:
+            self.logWARNING(f"Could not write the Excel cache for {file_path}: {e}")
+        return sheets
+
+    def iter_sheet_rows(self, file_path):
+        # Yields (sheet name, row tuples) in workbook order, like openpyxl's iter_rows(values_only=True)
+        for sheet_name, columns, row_count in self.load_sheets(file_path):
+            if columns:
+                yield sheet_name, zip(*columns)
+            else:
+                yield sheet_name, iter(())
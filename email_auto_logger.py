@@ -1,9 +1,31 @@
 import os
+import sys
+import atexit
+import queue
 import logging
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+
+class EmailAutoQueueHandler(QueueHandler):
+    def prepare(self, record):
+        # The listener runs in this process, so the record is queued as-is and formatted on its thread
+        return record
+
 
 class EmailAutoLogger:
-    def __init__(self):
+    LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+    CONSOLE_LEVELS = {'DEBUG': logging.DEBUG, 'INFO': logging.INFO, 'WARNING': logging.WARNING,
+                      'ERROR': logging.ERROR, 'OFF': logging.CRITICAL + 1}
+    MAX_BYTES = 10 * 1024 * 1024
+    BACKUP_COUNT = 5
+
+    # One listener per process, shared by every EmailAutoLogger
+    listener = None
+    file_handler = None
+    console_handler = None
+
+    def __init__(self, console_level=None, max_bytes=None, backup_count=None):
         # Create log folder
         log_directory = self.create_log_folder()
         os.makedirs(log_directory, exist_ok=True)
@@ -14,8 +36,10 @@ class EmailAutoLogger:
         # Define the log file name with the current date
         log_file = os.path.join(log_directory, f"email_sender_{current_date}.log")
         self.logging=logging
-        # Configure logging with the dynamic log file name
-        self.logging.basicConfig(filename=log_file, level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        # File and console writes happen on a background listener thread; callers only enqueue records
+        self.start_listener(log_file)
+        # Settings left as None keep whatever an earlier instance configured
+        self.configure(console_level, max_bytes, backup_count)
         # Log session start details
         self.logINFO(f"Session ID: {session_id}")
         self.logINFO(f"Session started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -29,6 +53,47 @@ class EmailAutoLogger:
     def logWARNING(self, message):
         self.logging.warning(f"[{self.__class__.__name__}] {message}")
 
+    def start_listener(self, log_file):
+        cls = EmailAutoLogger
+        if cls.listener:
+            return
+        # The daily file rolls over to email_sender_<date>.log.1, .2, ... once it reaches max_bytes
+        cls.file_handler = RotatingFileHandler(log_file, maxBytes=self.MAX_BYTES, backupCount=self.BACKUP_COUNT)
+        cls.file_handler.setFormatter(logging.Formatter(self.LOG_FORMAT))
+        cls.console_handler = logging.StreamHandler(sys.stdout)
+        cls.console_handler.setLevel(logging.INFO)
+        cls.console_handler.setFormatter(logging.Formatter('%(message)s'))
+        log_queue = queue.SimpleQueue()
+        root_logger = logging.getLogger()
+        root_logger.setLevel(logging.INFO)
+        root_logger.addHandler(EmailAutoQueueHandler(log_queue))
+        # Each handler drops records below its own level before formatting them
+        cls.listener = QueueListener(log_queue, cls.file_handler, cls.console_handler, respect_handler_level=True)
+        cls.listener.start()
+        atexit.register(self.stop)
+
+    def configure(self, console_level=None, max_bytes=None, backup_count=None):
+        cls = EmailAutoLogger
+        if console_level is not None:
+            level = self.CONSOLE_LEVELS.get(str(console_level).upper())
+            if level is None:
+                self.logWARNING(f"Unknown console log level '{console_level}'; using INFO.")
+                level = logging.INFO
+            cls.console_handler.setLevel(level)
+        if max_bytes is not None:
+            cls.file_handler.maxBytes = max_bytes
+        if backup_count is not None:
+            cls.file_handler.backupCount = backup_count
+
+    @staticmethod
+    def stop():
+        # Drain the queue so nothing logged before exit is lost
+        cls = EmailAutoLogger
+        if cls.listener:
+            cls.listener.stop()
+            cls.listener = None
+            cls.file_handler.close()
+
     def generate_session_id(self):
         # Generate a unique session ID based on the current timestamp
         return datetime.now().strftime("%Y%m%d%H%M%S")
@@ -40,4 +105,4 @@ class EmailAutoLogger:
         # Create the log folder if it doesn't exist
         log_directory = os.path.join("application_logs", current_year, current_month)
         os.makedirs(log_directory, exist_ok=True)
-        return log_directory
\ No newline at end of file
+        return log_directory
@@ -12,6 +12,21 @@ from email_auto_email_stats import EmailAutoEmailStats
 from email_auto_logger import EmailAutoLogger
 from email_auto_file_manager import EmailAutoFileManager
 from email_auto_repeated_elements_checker import RepeatedElementsChecker
+from email_auto_smtp_pool import EmailAutoSMTPPool
+from email_auto_send_engine import EmailAutoSendEngine
+from email_auto_rate_scheduler import EmailAutoRateScheduler
+from email_auto_attachment_cache import EmailAutoAttachmentCache
+from email_auto_template_engine import EmailAutoTemplateEngine
+from email_auto_sqlite_store import EmailAutoSQLiteStore
+from email_auto_recipient_deduper import EmailAutoRecipientDeduper
+from email_auto_recipient_source import EmailAutoRecipientSource
+from email_auto_sender_accounts import EmailAutoSenderAccountPool
+from email_auto_excel_cache import EmailAutoExcelCache
+from email_auto_metrics import EmailAutoMetrics
+from email_auto_pipeline import EmailAutoPipeline
+from email_auto_domain_interleaver import EmailAutoDomainInterleaver
+from email_auto_address_validator import (EmailAutoAddressValidator, EmailAutoDNSResolver, EmailAutoStubResolver,
+                                          EmailAutoMXCache, EmailAutoCacheOnlyResolver)
 
 class EmailAutoMainExecutor:
     def generate_pattern(pattern, repetitions):
@@ -22,13 +37,44 @@ class EmailAutoMainExecutor:
     PATTERN3 = generate_pattern("+", 100)
     PATTERN4 = generate_pattern("~", 100)
 
-    def __init__(self):
-        EmailAutoLogger()
+    def __init__(self, mode='send', run=True):
+        self.eaLoggerObj = EmailAutoLogger()
         self.logging = logging
+        self.mode = mode
+        # run=False only sets up logging, so the stages can be driven one by one from library code
+        if run:
+            self.run(mode)
+
+    def run(self, mode='send'):
+        if mode not in EmailAutoPipeline.MODES:
+            raise ValueError(f"Unknown run mode '{mode}', expected one of {EmailAutoPipeline.MODES}")
+        self.mode = mode
         self.logINFO(self.PATTERN1)
-        self.logINFO("Email sending process started.")
-        print("\nEmail sending process started.\n")
-
+        self.logINFO(f"Email sending process started ({mode}).")
+        print(f"\nEmail sending process started ({mode}).\n")
+        if not self.load_settings():
+            return None
+        self.prepare_campaign()
+        self.open_state(mode)
+        campaign_recipients = EmailAutoRecipientSource(self.logging, self.recipientsFile,
+                                                       chunk_size=self.recipient_chunk_size,
+                                                       encoding=self.recipients_file_encoding)
+        missing_fields = self.template_engine.missing_fields(campaign_recipients.fieldnames())
+        if missing_fields:
+            self.logWARNING(f"Template fields not found in recipients file, rendered empty: {missing_fields}")
+        pipeline = self.create_pipeline()
+        if mode == 'send':
+            summary = pipeline.run(campaign_recipients.iter_rows(), mode)
+            self.finish_send()
+            self.report()
+        else:
+            self.write_plan(pipeline.iter_items(campaign_recipients.iter_rows(), mode), mode)
+            summary = pipeline.summary()
+            self.logINFO(f"Pipeline finished ({mode}): {summary}")
+            print(f"\nEmail {mode} pass completed: {summary}\nPlan written to {self.plan_file}\n")
+        return summary
+
+    def load_settings(self):
         # Create output directory if not exists
         output_directory = 'output'
         if not os.path.exists(output_directory):
@@ -40,7 +86,12 @@ class EmailAutoMainExecutor:
             self.logINFO("Environment file loaded successfully!")
         except Exception as e:
             self.logERROR(f"Failed to load environment file: {e}")
-            return
+            return False
+
+        # Console verbosity (DEBUG, INFO, WARNING, ERROR or OFF) and size-based rotation of the daily log file
+        self.eaLoggerObj.configure(os.getenv('CONSOLE_LOG_LEVEL', 'INFO'),
+                                   int(os.getenv('LOG_MAX_BYTES', EmailAutoLogger.MAX_BYTES)),
+                                   int(os.getenv('LOG_BACKUP_COUNT', EmailAutoLogger.BACKUP_COUNT)))
 
         self.sender_email = os.getenv('SENDER_EMAIL')
         self.sender_password = os.getenv('SENDER_PASSWORD')
@@ -50,12 +101,64 @@ class EmailAutoMainExecutor:
         self.email_body_file = os.getenv('EMAIL_BODY_FILE')
         self.attachment_path = os.getenv('ATTACHMENT_PATH')
         self.domain_limit = int(os.getenv('DOMAIN_LIMIT', 10))-1
-        self.blacklist_file = os.getenv('BLACKLIST_FILE_PATH')  # Path to the blacklist file
+        self.blacklist_file = os.getenv('BLACKLIST_FILE_PATH', 'blacklist_domains.txt')  # Path to the blacklist file
+        # SMTP endpoint; point it at email_auto_smtp_sink.py to test without sending real mail
+        self.smtp_host = os.getenv('SMTP_HOST', EmailAutoEmailSender.SMTP_HOST)
+        self.smtp_port = int(os.getenv('SMTP_PORT', EmailAutoEmailSender.SMTP_PORT))
+        self.smtp_security = os.getenv('SMTP_SECURITY', 'ssl').lower()
+        self.send_engine_mode = os.getenv('SEND_ENGINE', 'sequential').lower()
+        self.send_concurrency = int(os.getenv('SEND_CONCURRENCY', 4))
+        self.domain_concurrency = int(os.getenv('DOMAIN_CONCURRENCY', 1))
+        # One SMTP session per in-flight message when the concurrent engine is used
+        default_pool_size = self.send_concurrency if self.send_engine_mode == 'concurrent' else 1
+        self.smtp_pool_size = int(os.getenv('SMTP_POOL_SIZE', default_pool_size))
+        self.smtp_max_messages_per_connection = int(os.getenv('SMTP_MAX_MESSAGES_PER_CONNECTION', 50))
+        self.smtp_max_connection_age = int(os.getenv('SMTP_MAX_CONNECTION_AGE', 300))
+        # Optional pool of sender identities; each account is then paced by its own rate and daily quota
+        self.sender_accounts_file = os.getenv('SENDER_ACCOUNTS_FILE')
+        self.sender_account_cooldown = int(os.getenv('SENDER_ACCOUNT_COOLDOWN_SECONDS', 900))
+        self.sender_account_count_file = os.getenv('SENDER_ACCOUNT_COUNT_FILE', 'senderAccountCount.csv')
+        # Token-bucket pacing; the defaults match the old NEXT_WAIT/RETRY_MINUTES sleeps
+        default_send_rate = 0 if self.sender_accounts_file else 60 / EmailAutoEmailSender.NEXT_WAIT
+        self.send_rate_per_minute = float(os.getenv('SEND_RATE_PER_MINUTE', default_send_rate))
+        self.send_burst = int(os.getenv('SEND_BURST', 1))
+        self.domain_rate_per_minute = float(os.getenv('DOMAIN_RATE_PER_MINUTE', 0))
+        self.domain_burst = int(os.getenv('DOMAIN_BURST', 1))
+        self.retry_backoff_seconds = int(os.getenv('RETRY_BACKOFF_SECONDS', EmailAutoEmailSender.RETRY_MINUTES))
+        self.send_max_retries = int(os.getenv('SEND_MAX_RETRIES', 0))
+        self.domain_count_flush_interval = int(os.getenv('DOMAIN_COUNT_FLUSH_INTERVAL_SECONDS', 30))
+        self.domain_count_flush_every = int(os.getenv('DOMAIN_COUNT_FLUSH_EVERY', 50))
+        self.state_backend = os.getenv('STATE_BACKEND', 'csv').lower()
+        self.state_db_path = os.getenv('STATE_DB_PATH', 'email_auto_state.sqlite')
+        self.recipient_column_map = EmailAutoRecipientSource.parse_column_map(os.getenv('RECIPIENT_COLUMN_MAP'))
+        self.recipient_sheets = [sheet.strip() for sheet in os.getenv('RECIPIENT_SHEETS', '').split(',') if sheet.strip()]
+        self.recipient_chunk_size = int(os.getenv('RECIPIENT_CHUNK_SIZE', 1000))
+        self.recipients_file_encoding = os.getenv('RECIPIENTS_FILE_ENCODING') or None
+        # Off by default: the cache holds whole workbooks in memory, while the read-only reader streams them
+        self.excel_cache_enabled = os.getenv('EXCEL_CACHE', 'false').lower() == 'true'
+        self.excel_cache_directory = os.getenv('EXCEL_CACHE_DIR') or None
+        # Address validation before sending: syntax and IDNA always, MX through the chosen resolver
+        self.validate_recipients = os.getenv('VALIDATE_RECIPIENTS', 'true').lower() == 'true'
+        self.mx_resolver = os.getenv('MX_RESOLVER', 'dns').lower()
+        self.mx_stub_file = os.getenv('MX_STUB_FILE')
+        self.mx_cache_file = os.getenv('MX_CACHE_FILE', 'mxCache.json')
+        self.mx_cache_ttl = int(os.getenv('MX_CACHE_TTL_SECONDS', 86400))
+        self.mx_cache_negative_ttl = int(os.getenv('MX_CACHE_NEGATIVE_TTL_SECONDS', 3600))
+        self.mx_lookup_workers = int(os.getenv('MX_LOOKUP_WORKERS', 16))
+        self.dedupe_recipients = os.getenv('DEDUPE_RECIPIENTS', 'true').lower() == 'true'
+        self.dedupe_strip_plus_tags = os.getenv('DEDUPE_STRIP_PLUS_TAGS', 'false').lower() == 'true'
+        self.send_order = os.getenv('SEND_ORDER', 'file').lower()
+        self.metrics_interval = int(os.getenv('METRICS_INTERVAL_SECONDS', 60))
+        self.attachment_mmap_threshold = int(os.getenv('ATTACHMENT_MMAP_THRESHOLD_BYTES', EmailAutoAttachmentCache.MMAP_THRESHOLD_BYTES))
         # self.email_send_status_file=os.getenv('EMAIL_SEND_STATUS_FILE_PATH')
+        return True
 
+    def prepare_campaign(self):
         # Set recipients file path to the one in the output directory
         output_directory = 'output'
         recipients_file_name = os.path.basename(self.recipientsFile)
+        # XLSX and differently laid-out lists are converted into a <name>.csv campaign copy
+        recipients_file_name = recipients_file_name.split('.')[0] + '.csv'
         output_recipients_file = os.path.join(output_directory, recipients_file_name.split('.')[0], recipients_file_name)
 
         # Use the copied recipients file from the output directory
@@ -70,15 +173,37 @@ class EmailAutoMainExecutor:
         recipient_directory = os.path.join(output_directory, recipients_file_name.split('.')[0])
         if not os.path.exists(recipient_directory):
             os.makedirs(recipient_directory)
+        self.campaign_name = recipients_file_name.split('.')[0]
+        self.campaign_directory = recipient_directory
         
         # Copy recipientsFile to recipient folder if not present already
         output_recipients_file = os.path.join(recipient_directory, os.path.basename(self.recipientsFile))
         if not os.path.exists(output_recipients_file):
-            shutil.copy(self.recipientsFileOrig, recipient_directory)
-
-
-        # Use the corresponding created SendStatus csv file
-        if not os.path.exists(self.email_send_status_file):
+            excel_cache = None
+            if self.excel_cache_enabled:
+                excel_cache = EmailAutoExcelCache(self.logging, self.excel_cache_directory)
+            recipient_source = EmailAutoRecipientSource(self.logging, self.recipientsFileOrig, self.recipient_column_map,
+                                                        self.recipient_chunk_size, self.recipient_sheets,
+                                                        self.recipients_file_encoding, excel_cache)
+            if recipient_source.needs_conversion():
+                # Stream rows in chunks straight into the campaign copy instead of loading the workbook
+                recipient_source.write_csv(output_recipients_file)
+            else:
+                shutil.copy(self.recipientsFileOrig, recipient_directory)
+
+        # Drop repeated addresses before sending; they are listed in a duplicates report instead
+        self.recipient_deduper = None
+        if self.dedupe_recipients:
+            campaign_name = recipients_file_name.split('.')[0]
+            deduped_recipients_file = os.path.join(recipient_directory, campaign_name + '_Deduped.csv')
+            duplicates_report_file = os.path.join(recipient_directory, campaign_name + '_Duplicates.csv')
+            self.recipient_deduper = EmailAutoRecipientDeduper(self.logging, strip_plus_tags=self.dedupe_strip_plus_tags)
+            self.recipient_deduper.dedupe_file(self.recipientsFile, deduped_recipients_file, duplicates_report_file,
+                                               self.recipients_file_encoding)
+            self.recipientsFile = deduped_recipients_file
+
+        # Use the corresponding created SendStatus csv file; plan and dry-run passes never create it
+        if not os.path.exists(self.email_send_status_file) and self.mode == 'send':
             with open(self.email_send_status_file, 'w', newline='') as csvfile:
                 fieldnames = ['emailId', 'FullName', 'timestamp', 'send_status', 'delivery_status_code', 'retry_count', 'error_message', 'delivery_duration']
                 writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
@@ -90,121 +215,126 @@ class EmailAutoMainExecutor:
 
         self.email_subject = self.eaFileMgrObj.read_file(self.email_subject_file).strip()
         self.email_body_template = self.eaFileMgrObj.read_file(self.email_body_file).strip()
+        # Parse subject and body once; rendering is then a join over precompiled chunks
+        self.template_engine = EmailAutoTemplateEngine(self.logging, self.email_subject, self.email_body_template)
 
+    def open_state(self, mode='send'):
+        # Plan and dry-run passes read the campaign state but never send or write it
+        self.mode = mode
         self.error_messages = []
-        eaCSVMgrObj = EmailAutoCSVManager(self.logging,self.email_send_status_file,self.domain_email_count_file)
-        email_send_status_dict = eaCSVMgrObj.read_email_send_status()
-        eaEmailSenderObj = EmailAutoEmailSender(self.logging, self.sender_email, self.sender_password)
-        domain_email_counter = EmailAutoDomainEmailCounter(self.logging)
-        domain_email_count = domain_email_counter.read_domain_email_count()
-
-        domain_blacklist = EmailAutoDomainBlacklist(self.logging, self.blacklist_file)
-        blacklist_domains = domain_blacklist.read_blacklist_domains()
+        # Optional SQLite backend for send status, domain counts and the blacklist
+        self.state_store = None
+        if self.state_backend == 'sqlite':
+            self.state_store = EmailAutoSQLiteStore(self.logging, self.state_db_path)
+        self.eaCSVMgrObj = EmailAutoCSVManager(self.logging,self.email_send_status_file,self.domain_email_count_file,self.state_store)
+        email_send_status_dict = self.eaCSVMgrObj.read_email_send_status(read_only=mode != 'send')
+        # Per-stage timings of the send path, written next to the SendStatus file during and after the run
+        self.metrics = EmailAutoMetrics(self.logging,
+                                        os.path.join(self.campaign_directory, self.campaign_name + '_Metrics.json'),
+                                        os.path.join(self.campaign_directory, self.campaign_name + '_Metrics.prom'),
+                                        self.metrics_interval)
+        self.domain_email_counter = EmailAutoDomainEmailCounter(self.logging, self.state_store, self.domain_email_count_file,
+                                                                self.domain_count_flush_interval,
+                                                                self.domain_count_flush_every, self.blacklist_file)
+        self.domain_email_counter.read_domain_email_count()
+        self.domain_blacklist = EmailAutoDomainBlacklist(self.logging, self.blacklist_file, self.state_store)
+        self.domain_blacklist.read_blacklist_domains()
+        self.eaEmailSenderObj = None
+        self.send_engine = None
+        if mode == 'send':
+            self.open_send_engine()
+
         self.domain_email_recipients_file = self.recipientsFile
-        self.eaEmailStatsObj= EmailAutoEmailStats(self.email_send_status_file,self.domain_email_recipients_file,self.logging)
+        self.eaEmailStatsObj= EmailAutoEmailStats(self.email_send_status_file,self.domain_email_recipients_file,self.logging,
+                                                  self.recipients_file_encoding)
+        # Count from the status already in memory; outcomes then update the counters directly
+        self.eaEmailStatsObj.load(email_send_status_dict)
         self.eaEmailStatsObj.print_email_info()
 
+        self.invalid_recipients = {}
+        if self.validate_recipients:
+            self.invalid_recipients = self.create_address_validator().validate_file(self.recipientsFile,
+                                                                                    self.recipients_file_encoding)
+
         self.totalEmailCount=self.eaEmailStatsObj.get_total_emails()
         self.failedCount=self.eaEmailStatsObj.get_failed_emails()
-        self.pendingCount=0
         self.successCount=self.eaEmailStatsObj.success_emails_count()
 
-        with open(self.recipientsFile, 'r') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                full_name = row['fullName']
-                recipient_email = row['emailId']
-                self.logINFO(self.PATTERN2)
-                self.start_action(f"Processing Email: {self.pendingCount+1}/{self.totalEmailCount}")
-                self.start_action(f"processing email to {recipient_email}")
-
-                # Check if recipient's domain is in the blacklist
-                recipient_domain = recipient_email.split('@')[-1]
-                if recipient_domain in blacklist_domains:
-                    self.logWARNING(f"Skipping email to {recipient_email} as the domain is in the blacklist.")
-                    print(f"Skipping email to {recipient_email} as the domain is in the blacklist.")
-                    self.pendingCount+=1
-                    continue
-                
-                domain_email_count = domain_email_counter.track_domain_email_count(email_send_status_dict,recipient_email, domain_email_count)
-                
-                # Check and blacklist domain if limit exceeded
-                domain_email_counter.check_and_blacklist_domain(recipient_email, domain_email_count, self.domain_limit)
-
-                # Check if email is already sent
-                if recipient_email in email_send_status_dict:
-                    status = email_send_status_dict[recipient_email]['send_status']
-                    if status == 'success':
-                        self.logWARNING(f"Email {recipient_email} has already been successfully sent.")
-                        print(f"Email {recipient_email} has already been successfully sent.")
-                        self.pendingCount+=1
-                        continue
-                    elif status == 'failure':
-                        self.logWARNING(f"Email {recipient_email} has already failed to send.")
-                        print(f"Email {recipient_email} has already failed to send.")
-                        # Retry sending the email
-                        try:
-                            first_name = full_name.split()[0]
-                            self.email_body_template_replaced=self.email_body_template.replace('[Placeholder]', first_name)
-                            first_line = self.email_body_template_replaced.split('\n')[0]
-                            self.logINFO(f"First line of body: {first_line}")
-                            print(f"First line of body: {first_line}")
-                            status = eaEmailSenderObj.send_email(recipient_email, full_name, self.email_subject,
-                                                     self.email_body_template_replaced, self.attachment_path,
-                                                     domain_email_count, self.domain_limit)
-                            email_send_status_dict[recipient_email] = status
-                            self.pendingCount+=1
-                        except Exception as e:
-                            error_message = f"Error sending email to {recipient_email}: {e}"
-                            print(error_message)
-                            self.action_failed("sending email", error_message)
-                            email_send_status_dict[recipient_email] = 'failure'
-                        # Update email send status to CSV
-                        eaCSVMgrObj.write_email_send_status()
-                        self.pendingCount+=1
-                        continue
-                    else:
-                        self.logWARNING(f"Unknown status for email {recipient_email}: {status}")
-                        print(f"Unknown status for email {recipient_email}: {status}")
-                        self.pendingCount+=1
-                        continue
-                # Email has not been sent before, send it
-                try:
-                    first_name = full_name.split()[0]
-                    self.email_body_template_replaced=self.email_body_template.replace('[Placeholder]', first_name)
-                    first_line = self.email_body_template_replaced.split('\n')[0]
-                    self.logINFO(f"First line of body: {first_line}")
-                    print(f"First line of body: {first_line}")
-                    status = eaEmailSenderObj.send_email(recipient_email, full_name, self.email_subject,
-                                                     self.email_body_template_replaced, self.attachment_path,
-                                                     domain_email_count, self.domain_limit)
-                    email_send_status_dict[recipient_email] = status
-                    self.logINFO(f"Status for email {recipient_email}: {status}")
-                    self.pendingCount+=1
-                except Exception as e:
-                    error_message = f"Error sending email to {recipient_email}: {e}"
-                    print(error_message)
-                    self.action_failed("sending email", error_message)
-                    email_send_status_dict[recipient_email] = 'failure'
-                    self.pendingCount+=1
-                # Update email send status to CSV after processing each email
-                eaCSVMgrObj.write_email_send_status()
-
-                status = eaEmailSenderObj.send_email(recipient_email, full_name, self.email_subject,
-                                                     self.email_body_template, self.attachment_path,
-                                                     domain_email_count, self.domain_limit)
-
-                email_send_status_dict[recipient_email] = status
-                eaCSVMgrObj.write_email_send_status()
-
-                # Wait for 2 seconds before sending the next email
-                # time.sleep(2)
-
-                if email_send_status_dict[recipient_email]['send_status'] == 'failure':
-                    self.error_messages.append([full_name, recipient_email, status['send_status'], status['error_message']])
-
-                self.action_done(f"processing email to {recipient_email}")
-
+    def open_send_engine(self):
+        smtp_pool = EmailAutoSMTPPool(self.logging, self.smtp_host, self.smtp_port,
+                                      self.sender_email, self.sender_password, self.smtp_pool_size,
+                                      self.smtp_max_messages_per_connection, self.smtp_max_connection_age,
+                                      security=self.smtp_security, metrics=self.metrics)
+        rate_scheduler = EmailAutoRateScheduler(self.logging, self.send_rate_per_minute, self.send_burst,
+                                                self.domain_rate_per_minute, self.domain_burst,
+                                                self.retry_backoff_seconds, self.domain_concurrency)
+        attachment_cache = EmailAutoAttachmentCache(self.logging, self.attachment_mmap_threshold)
+        self.domain_email_counter.install_shutdown_hooks()
+        self.domain_email_counter.start_flush_timer()
+        self.domain_email_counter.add_blacklist_listener(self.domain_blacklist.on_domain_blacklisted)
+        sender_accounts = None
+        if self.sender_accounts_file:
+            sender_accounts = EmailAutoSenderAccountPool(self.logging, self.sender_account_cooldown,
+                                                         self.sender_account_count_file)
+            sender_accounts.load_accounts_file(self.sender_accounts_file, self.smtp_host, self.smtp_port,
+                                               60 / EmailAutoEmailSender.NEXT_WAIT, self.smtp_pool_size,
+                                               self.smtp_max_messages_per_connection, self.smtp_max_connection_age,
+                                               self.smtp_security, self.metrics)
+        self.eaEmailSenderObj = EmailAutoEmailSender(self.logging, self.sender_email, self.sender_password,
+                                                     smtp_pool, rate_scheduler, attachment_cache,
+                                                     self.domain_email_counter, sender_accounts, self.metrics)
+
+        # Keep several messages in flight when the concurrent engine is selected, otherwise send inline
+        send_concurrency = self.send_concurrency if self.send_engine_mode == 'concurrent' else 1
+        self.send_engine = EmailAutoSendEngine(self.logging, self.eaEmailSenderObj, self.domain_email_counter,
+                                               self.record_outcome, rate_scheduler, send_concurrency,
+                                               self.send_max_retries, metrics=self.metrics)
+
+    def create_pipeline(self):
+        return EmailAutoPipeline(self.logging, self.template_engine, self.domain_blacklist, self.domain_email_counter,
+                                 self.domain_limit, self.eaCSVMgrObj.email_send_status_dict, self.invalid_recipients,
+                                 self.recipient_deduper, self.send_engine, self.attachment_path,
+                                 self.metrics, self.create_interleaver())
+
+    def create_interleaver(self):
+        if self.send_order == 'interleaved':
+            return EmailAutoDomainInterleaver(self.logging, self.domain_email_counter, self.domain_limit)
+        if self.send_order != 'file':
+            self.logWARNING(f"Unknown SEND_ORDER '{self.send_order}', sending in file order.")
+        return None
+
+    def write_plan(self, items, mode):
+        # One line per recipient row with what the send would do; the SendStatus file is left alone
+        self.plan_file = os.path.join(self.campaign_directory,
+                                      self.campaign_name + ('_Plan.csv' if mode == 'plan' else '_DryRun.csv'))
+        with open(self.plan_file, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['emailId', 'FullName', 'action', 'reason', 'subject'])
+            for item in items:
+                writer.writerow([item['email'], item['full_name'], item['action'], item['reason'], item['subject'] or ''])
+        if self.state_store:
+            self.state_store.close()
+
+    def finish_send(self):
+        # Wait for queued and in-flight messages before closing the pool
+        self.send_engine.close()
+
+        # Close pooled SMTP sessions once every recipient has been processed
+        self.eaEmailSenderObj.close()
+
+        # Persist the buffered per-domain counts
+        self.domain_email_counter.stop_flush_timer()
+        self.domain_email_counter.flush()
+
+        self.metrics.write()
+        self.log_metrics_summary()
+
+        # Write the journaled outcomes back into the canonical SendStatus CSV
+        self.eaCSVMgrObj.compact_email_send_status()
+        if self.state_store:
+            self.state_store.close()
+
+    def report(self):
         if self.error_messages:
             headers = ['Full Name', 'Recipient Email', 'Send Status', 'Error Message']
             print("\nError Messages:")
@@ -217,41 +347,78 @@ class EmailAutoMainExecutor:
         self.eaEmailStatsObj.print_email_info()
         self.logging.info(self.PATTERN4)
         print(self.PATTERN4)
-        recObj=RepeatedElementsChecker()
+        if self.recipient_deduper:
+            duplicate_count = self.recipient_deduper.duplicate_rows
+        else:
+            duplicate_count = RepeatedElementsChecker().count_duplicate_rows(self.recipientsFile,
+                                                                             self.recipients_file_encoding)
 
         self.logging.info(self.PATTERN1)
-        print(f"Has Duplicates? : {recObj.has_duplicate_rows(self.recipientsFile)}")
-        self.logging.info(f"Has Duplicates? : {recObj.has_duplicate_rows(self.recipientsFile)}")
-        print(f"Total No. Of Duplicates: {recObj.count_duplicate_rows(self.recipientsFile)}")
-        self.logging.info(f"Total No. Of Duplicates: {recObj.count_duplicate_rows(self.recipientsFile)}")
+        print(f"Has Duplicates? : {duplicate_count > 0}")
+        self.logging.info(f"Has Duplicates? : {duplicate_count > 0}")
+        print(f"Total No. Of Duplicates: {duplicate_count}")
+        self.logging.info(f"Total No. Of Duplicates: {duplicate_count}")
         self.logging.info(self.PATTERN1)
         print(self.PATTERN1)
 
 
+    def log_metrics_summary(self):
+        for stage, summary in self.metrics.report()['stages'].items():
+            if summary['count']:
+                self.logINFO(f"Stage {stage}: {summary['count']} calls, {summary['sum_seconds']:.3f} s total, "
+                             f"mean {summary['mean_seconds'] * 1000:.2f} ms, p99 <= {summary['p99_seconds'] * 1000:.2f} ms")
+        self.logINFO(f"Metrics written to {self.metrics.json_file} and {self.metrics.prometheus_file}")
+
+    def create_address_validator(self):
+        # Plan and dry-run passes only read state: no live DNS, and the MX cache file is left as it is
+        live_lookups = self.mode == 'send'
+        resolver = None
+        if self.mx_resolver == 'dns':
+            resolver = EmailAutoDNSResolver() if live_lookups else EmailAutoCacheOnlyResolver()
+        elif self.mx_resolver == 'stub':
+            resolver = EmailAutoStubResolver.from_file(self.mx_stub_file) if self.mx_stub_file else EmailAutoStubResolver()
+        # The MX cache holds real DNS answers only; stub answers would later be read back as real results
+        mx_cache = None
+        if self.mx_resolver == 'dns':
+            mx_cache = EmailAutoMXCache(self.logging, self.mx_cache_file, self.mx_cache_ttl, self.mx_cache_negative_ttl,
+                                        read_only=not live_lookups)
+        # The sender's own domain must resolve; if it does not, DNS is down and MX checks are skipped
+        canary_domain = None
+        if self.mx_resolver == 'dns' and self.sender_email and live_lookups:
+            canary_domain = self.sender_email.split('@')[-1].lower()
+        return EmailAutoAddressValidator(self.logging, resolver, mx_cache, self.mx_lookup_workers, canary_domain)
+
+    def record_outcome(self, recipient_email, full_name, status):
+        self.logINFO(f"Status for email {recipient_email}: {status}")
+        previous_status = self.eaCSVMgrObj.email_send_status_dict.get(recipient_email)
+        # Append the outcome to the send status journal after processing each email
+        with self.metrics.timer('status_persist'):
+            self.eaCSVMgrObj.record_email_send_status(recipient_email, status)
+        self.metrics.increment('messages', status['delivery_status_code'])
+        self.metrics.maybe_write()
+        self.eaEmailStatsObj.record_outcome(recipient_email, status, previous_status)
+        if status['send_status'] == 'failure':
+            self.error_messages.append([full_name, recipient_email, status['send_status'], status['error_message']])
+        self.action_done(f"processing email to {recipient_email}")
+
     def logINFO(self, message):
         self.logging.info(f"[{self.__class__.__name__}] {message}")
-        print(f"[{self.__class__.__name__}] {message}")
 
     def logERROR(self, message):
         self.logging.error(f"[{self.__class__.__name__}] {message}")
-        print(f"[{self.__class__.__name__}] {message}")
 
     def logWARNING(self, message):
         self.logging.warning(f"[{self.__class__.__name__}] {message}")
-        print(f"[{self.__class__.__name__}] {message}")
 
     def start_action(self, action_name):
         log_message = f"Starting {action_name}..."
         self.logINFO(log_message)
-        # print(log_message)
 
     def action_done(self, action_name):
         log_message = f"{action_name} completed successfully."
         self.logINFO(log_message)
-        # print(log_message)
 
     def action_failed(self, action_name, error_message):
         log_message = f"{action_name} failed: {error_message}"
         self.logERROR(log_message)
-        # print(log_message)
 
@@ -0,0 +1,162 @@
+import bisect
+import contextlib
+import json
+import os
+import threading
+import time
+import logging
+from datetime import datetime
+
+
+class EmailAutoHistogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # One count per upper bound, plus the +Inf bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def cumulative_counts(self):
+        total = 0
+        for count in self.counts:
+            total += count
+            yield total
+
+    def quantile(self, fraction):
+        # Upper bound of the bucket holding the given fraction of observations; the max for the +Inf bucket
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        for index, total in enumerate(self.cumulative_counts()):
+            if total >= target:
+                return min(self.buckets[index], self.max) if index < len(self.buckets) else self.max
+        return self.max
+
+
+class EmailAutoMetrics:
+    # Per-recipient stages of the send path, in the order a message goes through them
+    STAGES = ('scheduler_wait', 'template_render', 'attachment_encode', 'mime_build', 'smtp_connect', 'smtp_login',
+              'smtp_send', 'delivery', 'status_persist')
+    BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+    PREFIX = 'emailauto'
+
+    def __init__(self, logging, json_file=None, prometheus_file=None, write_interval_seconds=60):
+        self.logging = logging
+        self.json_file = json_file
+        self.prometheus_file = prometheus_file
+        # 0 writes the reports only when the run ends
+        self.write_interval_seconds = write_interval_seconds
+        self.histograms = {stage: EmailAutoHistogram(self.BUCKETS) for stage in self.STAGES}
+        # {(counter name, delivery status code or ''): count}
+        self.counters = {}
+        self.started_at = time.time()
+        self.last_write = time.monotonic()
+        self.lock = threading.Lock()
+
+    def logINFO(self, message):
+        self.logging.info(f"[{self.__class__.__name__}] {message}")
+
+    def logERROR(self, message):
+        self.logging.error(f"[{self.__class__.__name__}] {message}")
+
+    def logWARNING(self, message):
+        self.logging.warning(f"[{self.__class__.__name__}] {message}")
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            self.histograms[stage].observe(seconds)
+
+    @contextlib.contextmanager
+    def timer(self, stage):
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started_at)
+
+    def increment(self, name, code='', amount=1):
+        key = (name, code)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def report(self):
+        with self.lock:
+            stages = {}
+            for stage, histogram in self.histograms.items():
+                stages[stage] = {
+                    'count': histogram.count,
+                    'sum_seconds': round(histogram.sum, 6),
+                    'mean_seconds': round(histogram.sum / histogram.count, 6) if histogram.count else 0.0,
+                    'p50_seconds': round(histogram.quantile(0.5), 6),
+                    'p90_seconds': round(histogram.quantile(0.9), 6),
+                    'p99_seconds': round(histogram.quantile(0.99), 6),
+                    'max_seconds': round(histogram.max, 6),
+                    'buckets': dict(zip([str(bound) for bound in self.BUCKETS] + ['+Inf'],
+                                        histogram.cumulative_counts()))
+                }
+            counters = {}
+            for (name, code), count in sorted(self.counters.items()):
+                if code:
+                    counters.setdefault(name, {})[code] = count
+                else:
+                    counters[name] = count
+        return {
+            'started_at': datetime.fromtimestamp(self.started_at).strftime('%Y-%m-%d %H:%M:%S'),
+            'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'elapsed_seconds': round(time.time() - self.started_at, 3),
+            'stages': stages,
+            'counters': counters
+        }
+
+    def prometheus_text(self):
+        lines = [
+            f"# HELP {self.PREFIX}_stage_seconds Time spent per recipient in each stage of the send path.",
+            f"# TYPE {self.PREFIX}_stage_seconds histogram"
+        ]
+        with self.lock:
+            for stage, histogram in self.histograms.items():
+                bounds = [repr(float(bound)) for bound in self.BUCKETS] + ['+Inf']
+                for bound, total in zip(bounds, histogram.cumulative_counts()):
+                    lines.append(f'{self.PREFIX}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {total}')
+                lines.append(f'{self.PREFIX}_stage_seconds_sum{{stage="{stage}"}} {histogram.sum!r}')
+                lines.append(f'{self.PREFIX}_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+            counters = sorted(self.counters.items())
+        declared = set()
+        for (name, code), count in counters:
+            metric = f"{self.PREFIX}_{name}_total"
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} counter")
+                declared.add(metric)
+            labels = f'{{code="{code}"}}' if code else ''
+            lines.append(f"{metric}{labels} {count}")
+        lines.append(f"# TYPE {self.PREFIX}_run_start_time_seconds gauge")
+        lines.append(f"{self.PREFIX}_run_start_time_seconds {self.started_at!r}")
+        return '\n'.join(lines) + '\n'
+
+    def write_file(self, file_path, content):
+        # Replace the file in one step so a scraper never reads half a report
+        temp_file = file_path + '.tmp'
+        with open(temp_file, 'w') as file:
+            file.write(content)
+        os.replace(temp_file, file_path)
+
+    def write(self):
+        self.last_write = time.monotonic()
+        try:
+            if self.json_file:
+                self.write_file(self.json_file, json.dumps(self.report(), indent=2))
+            if self.prometheus_file:
+                self.write_file(self.prometheus_file, self.prometheus_text())
+        except OSError as e:
+            self.logERROR(f"Failed to write metrics: {e}")
+
+    def maybe_write(self):
+        if self.write_interval_seconds and time.monotonic() - self.last_write >= self.write_interval_seconds:
+            self.write()
@@ -0,0 +1,205 @@
+import logging
+from collections import Counter
+
+
+class EmailAutoPipeline:
+    # plan: decide each row only; dry_run: also render; send: render, send and record outcomes
+    MODES = ('plan', 'dry_run', 'send')
+
+    def __init__(self, logging, template_engine=None, domain_blacklist=None, domain_email_counter=None, domain_limit=None,
+                 send_status_dict=None, invalid_recipients=None, deduper=None, send_engine=None, attachment_path=None,
+                 metrics=None, interleaver=None):
+        self.logging = logging
+        self.template_engine = template_engine
+        self.domain_blacklist = domain_blacklist
+        self.domain_email_counter = domain_email_counter
+        self.domain_limit = domain_limit
+        # Outcomes of earlier runs by email; recording an outcome keeps it current during a send
+        self.send_status_dict = send_status_dict if send_status_dict is not None else {}
+        self.invalid_recipients = invalid_recipients or {}
+        # Without a deduper, repeated rows are only caught once the earlier row's outcome is recorded
+        self.deduper = deduper
+        self.send_engine = send_engine
+        self.attachment_path = attachment_path
+        self.metrics = metrics
+        # Optional EmailAutoDomainInterleaver; rows are then sent round-robin across domains instead of in file order
+        self.interleaver = interleaver
+        self.mode = 'plan'
+        self.counts = Counter()
+
+    def logINFO(self, message):
+        self.logging.info(f"[{self.__class__.__name__}] {message}")
+
+    def logERROR(self, message):
+        self.logging.error(f"[{self.__class__.__name__}] {message}")
+
+    def logWARNING(self, message):
+        self.logging.warning(f"[{self.__class__.__name__}] {message}")
+
+    def skip(self, item, reason, message):
+        self.logWARNING(message)
+        item['action'] = 'skip'
+        item['reason'] = reason
+
+    def load(self, rows):
+        for row_number, row in enumerate(rows, start=1):
+            yield {
+                'row_number': row_number,
+                'row': row,
+                'email': row.get('emailId') or '',
+                'full_name': row.get('fullName') or '',
+                'domain': '',
+                # None while undecided, then 'send', 'skip' or 'record' (recorded without sending)
+                'action': None,
+                'reason': '',
+                'status': None,
+                'subject': None,
+                'body': None
+            }
+
+    def normalize(self, items):
+        for item in items:
+            item['email'] = item['email'].strip()
+            item['full_name'] = item['full_name'].strip()
+            item['domain'] = item['email'].split('@')[-1].lower()
+            self.logINFO(f"Processing row {item['row_number']}: {item['email']}")
+            yield item
+
+    def validate(self, items):
+        # Addresses that failed validation are recorded without ever reaching the sender
+        for item in items:
+            status = self.invalid_recipients.get(item['email'])
+            if item['action'] is None and status:
+                previous_status = self.send_status_dict.get(item['email'])
+                if not (previous_status and previous_status['send_status'] == 'success'):
+                    self.logWARNING(f"Skipping invalid address {item['email']}: {status['error_message']}")
+                    item.update(action='record', reason=status['delivery_status_code'], status=status)
+            yield item
+
+    def blacklist_filter(self, items):
+        for item in items:
+            if item['action'] is None and self.domain_blacklist and self.domain_blacklist.is_blacklisted(item['domain']):
+                self.skip(item, 'Blacklisted', f"Skipping email to {item['email']} as the domain is in the blacklist.")
+            yield item
+
+    def dedupe(self, items):
+        seen = set()
+        for item in items:
+            if item['action'] is None:
+                self.check_repeat(item, seen)
+            yield item
+
+    def check_repeat(self, item, seen):
+        email = item['email']
+        if self.mode == 'send':
+            # A repeated address must see the outcome of its earlier row
+            self.send_engine.wait_until_recorded(email)
+        # Nothing is recorded while planning or before interleaved rows are sent, so repeats are tracked here
+        if email and (self.deduper or self.interleaver or self.mode != 'send'):
+            key = self.deduper.key(self.deduper.normalize(email)) if self.deduper else email
+            if key in seen:
+                self.skip(item, 'Duplicate', f"Skipping repeated address {email}.")
+                return
+            seen.add(key)
+        previous_status = self.send_status_dict.get(email)
+        if not previous_status:
+            return
+        if previous_status['send_status'] == 'success':
+            self.skip(item, 'AlreadySent', f"Email {email} has already been successfully sent.")
+        elif previous_status['send_status'] == 'failure':
+            self.logWARNING(f"Email {email} has already failed to send.")
+            item['reason'] = 'Retry'
+        else:
+            self.skip(item, 'UnknownStatus', f"Unknown status for email {email}: {previous_status['send_status']}")
+
+    def interleave(self, items):
+        if self.interleaver:
+            # Held rows are checked again for domains blacklisted on reaching their limit while they waited
+            return self.blacklist_filter(self.interleaver.reorder(items))
+        return items
+
+    def domain_gate(self, items):
+        planned_counts = Counter()
+        for item in items:
+            if item['action'] is None and self.domain_email_counter and self.domain_limit is not None:
+                if self.mode == 'send':
+                    # Over-limit rows are then failed by the send engine, in send order
+                    self.domain_email_counter.track_domain_email_count(item['email'])
+                    self.domain_email_counter.check_and_blacklist_domain(item['email'], self.domain_limit)
+                else:
+                    self.plan_domain_limit(item, planned_counts)
+            yield item
+
+    def plan_domain_limit(self, item, planned_counts):
+        # Same rule as the send path, on top of today's persisted counts and without writing anything
+        domain = item['email'].split('@')[-1]
+        planned_counts[domain] += 1
+        count = self.domain_email_counter.get_count(domain) + planned_counts[domain]
+        if count == self.domain_limit + 1 and self.domain_blacklist:
+            self.domain_blacklist.on_domain_blacklisted(item['domain'])
+        if count > self.domain_limit:
+            item['action'] = 'record'
+            item['reason'] = 'DomainEmailLimitExceeded'
+
+    def render(self, items):
+        for item in items:
+            if item['action'] is None:
+                if self.metrics:
+                    with self.metrics.timer('template_render'):
+                        item['subject'], item['body'] = self.template_engine.render(item['row'])
+                else:
+                    item['subject'], item['body'] = self.template_engine.render(item['row'])
+                first_line = item['body'].split('\n', 1)[0]
+                self.logINFO(f"First line of body: {first_line}")
+            yield item
+
+    def send(self, items):
+        for item in items:
+            if item['action'] is None:
+                item['action'] = 'send'
+                if self.mode == 'send':
+                    self.send_engine.submit(item['email'], item['full_name'], item['subject'], item['body'],
+                                            self.attachment_path, self.domain_limit)
+            yield item
+
+    def record(self, items):
+        for item in items:
+            if item['action'] == 'record' and item['status'] and self.mode == 'send':
+                # Recorded by the send engine, so every outcome is written from one thread
+                self.send_engine.record_decided(item['email'], item['full_name'], item['status'])
+            self.counts[(item['action'], item['reason'])] += 1
+            yield item
+
+    def iter_items(self, rows, mode='plan'):
+        # Every stage is a generator, so rows are read, decided and sent one at a time
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown pipeline mode '{mode}', expected one of {self.MODES}")
+        if mode == 'send' and not self.send_engine:
+            raise ValueError("The send mode needs a send engine.")
+        self.mode = mode
+        self.counts = Counter()
+        items = self.normalize(self.load(rows))
+        items = self.validate(items)
+        items = self.blacklist_filter(items)
+        items = self.dedupe(items)
+        items = self.interleave(items)
+        items = self.domain_gate(items)
+        if mode != 'plan':
+            items = self.render(items)
+        items = self.send(items)
+        return self.record(items)
+
+    def run(self, rows, mode='plan'):
+        for item in self.iter_items(rows, mode):
+            pass
+        self.logINFO(f"Pipeline finished ({mode}): {self.summary()}")
+        return self.summary()
+
+    def summary(self):
+        # {action: count} plus {action:reason: count} for the reasons behind each action
+        summary = Counter()
+        for (action, reason), count in self.counts.items():
+            summary[action] += count
+            if reason:
+                summary[f"{action}:{reason}"] += count
+        return dict(summary)
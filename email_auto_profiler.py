@@ -0,0 +1,127 @@
+import cProfile
+import io
+import os
+import pstats
+import shutil
+import tracemalloc
+import logging
+from datetime import datetime
+from dotenv import load_dotenv
+
+from email_auto_logger import EmailAutoLogger
+from email_auto_smtp_sink import EmailAutoSMTPSink
+
+
+class EmailAutoProfiler:
+    # Inputs named by path in .env; made absolute because the profiled run works in its own folder
+    PATH_SETTINGS = ('RECIPIENTS_FILE_PATH', 'EMAIL_SUBJECT_FILE', 'EMAIL_BODY_FILE', 'ATTACHMENT_PATH', 'MX_STUB_FILE',
+                     'MX_CACHE_FILE')
+    TRACEMALLOC_FRAMES = 10
+
+    def __init__(self, logging, top_functions=40, top_allocations=30, sink_latency_ms=0):
+        self.logging = logging
+        self.top_functions = top_functions
+        self.top_allocations = top_allocations
+        self.sink_latency_ms = sink_latency_ms
+        self.profile_directory = None
+
+    def logINFO(self, message):
+        self.logging.info(f"[{self.__class__.__name__}] {message}")
+
+    def logERROR(self, message):
+        self.logging.error(f"[{self.__class__.__name__}] {message}")
+
+    def logWARNING(self, message):
+        self.logging.warning(f"[{self.__class__.__name__}] {message}")
+
+    def prepare_environment(self):
+        # The run sends to the local sink and keeps its status, counts and blacklist apart from the real campaign
+        load_dotenv()
+        recipients_file = os.getenv('RECIPIENTS_FILE_PATH') or 'recipients'
+        campaign_name = os.path.basename(recipients_file).split('.')[0]
+        self.profile_directory = os.path.abspath(os.path.join(
+            'output', campaign_name, 'profile_' + datetime.now().strftime('%Y%m%d_%H%M%S')))
+        os.makedirs(self.profile_directory, exist_ok=True)
+        for setting in self.PATH_SETTINGS:
+            if os.getenv(setting):
+                os.environ[setting] = os.path.abspath(os.environ[setting])
+        blacklist_file = os.getenv('BLACKLIST_FILE_PATH', 'blacklist_domains.txt')
+        profile_blacklist_file = os.path.join(self.profile_directory, 'blacklist_domains.txt')
+        if os.path.exists(blacklist_file):
+            shutil.copy(blacklist_file, profile_blacklist_file)
+        os.environ.update({
+            'SENDER_ACCOUNTS_FILE': '',
+            # cProfile only sees the thread that enabled it, so every send has to run on the main thread
+            'SEND_ENGINE': 'sequential',
+            'SEND_RATE_PER_MINUTE': '0',
+            'DOMAIN_RATE_PER_MINUTE': '0',
+            'RETRY_BACKOFF_SECONDS': '0',
+            'BLACKLIST_FILE_PATH': profile_blacklist_file,
+            'DOMAIN_EMAIL_COUNT_CSV_FILE_PATH': os.path.join(self.profile_directory, 'domainEmailCount.csv'),
+            'STATE_DB_PATH': os.path.join(self.profile_directory, 'email_auto_state.sqlite')
+        })
+        os.environ.setdefault('CONSOLE_LOG_LEVEL', 'ERROR')
+
+    def write_function_report(self, profiler):
+        report_file = os.path.join(self.profile_directory, 'profile_hot_functions.txt')
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream)
+        stream.write(f"Top {self.top_functions} functions by cumulative time\n\n")
+        stats.sort_stats('cumulative').print_stats(self.top_functions)
+        stream.write(f"\nTop {self.top_functions} functions by own time\n\n")
+        stats.sort_stats('tottime').print_stats(self.top_functions)
+        with open(report_file, 'w') as file:
+            file.write(stream.getvalue())
+        # The raw stats can be opened again with pstats or a viewer such as snakeviz
+        stats.dump_stats(os.path.join(self.profile_directory, 'profile.pstats'))
+        return report_file
+
+    def write_allocation_report(self, snapshot, peak_bytes):
+        report_file = os.path.join(self.profile_directory, 'profile_allocations.txt')
+        # Leave out the sink, which only stands in for the mail server
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '*email_auto_smtp_sink.py'),
+            tracemalloc.Filter(False, '*socketserver.py')
+        ])
+        statistics = snapshot.statistics('lineno')
+        with open(report_file, 'w') as file:
+            file.write(f"Peak traced memory: {peak_bytes / 1024 / 1024:.1f} MiB\n")
+            file.write(f"Top {self.top_allocations} allocation sites still held at the end of the run\n\n")
+            for stat in statistics[:self.top_allocations]:
+                file.write(f"{stat.size / 1024:10.1f} KiB {stat.count:9d} blocks  {stat.traceback[0]}\n")
+            file.write(f"\nTop {self.top_allocations} allocation sites by call stack\n")
+            for stat in snapshot.statistics('traceback')[:self.top_allocations]:
+                file.write(f"\n{stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+                file.write('\n'.join(stat.traceback.format()) + '\n')
+        return report_file
+
+    def run(self, executor_class):
+        original_directory = os.getcwd()
+        self.prepare_environment()
+        os.chdir(self.profile_directory)
+        # Set up the queued logger before the sink logs anything, so the run keeps its own log folder
+        EmailAutoLogger(os.getenv('CONSOLE_LOG_LEVEL'))
+        sink = EmailAutoSMTPSink(self.logging, '127.0.0.1', 0, self.sink_latency_ms, log_messages=False)
+        host, port = sink.start()
+        os.environ.update({'SMTP_HOST': host, 'SMTP_PORT': str(port), 'SMTP_SECURITY': 'none'})
+        profiler = cProfile.Profile()
+        tracemalloc.start(self.TRACEMALLOC_FRAMES)
+        try:
+            profiler.enable()
+            try:
+                executor_class()
+            finally:
+                profiler.disable()
+            snapshot = tracemalloc.take_snapshot()
+            peak_bytes = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+            os.chdir(original_directory)
+            sink.stop()
+        function_report = self.write_function_report(profiler)
+        allocation_report = self.write_allocation_report(snapshot, peak_bytes)
+        self.logINFO(f"Profile written to {function_report} and {allocation_report}")
+        print(f"\nHot functions: {function_report}")
+        print(f"Allocation sites: {allocation_report}")
+        return function_report, allocation_report
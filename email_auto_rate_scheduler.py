@@ -0,0 +1,159 @@
+import heapq
+import itertools
+import threading
+import time
+import logging
+from collections import defaultdict, deque
+
+
+class EmailAutoTokenBucket:
+    def __init__(self, rate_per_second, burst):
+        self.rate_per_second = rate_per_second
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+
+    def refill(self, now):
+        if self.rate_per_second > 0:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate_per_second)
+        else:
+            self.tokens = float(self.burst)
+        self.updated_at = now
+
+    def wait_time(self, now):
+        self.refill(now)
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate_per_second)
+        return wait
+
+    def consume(self, now):
+        self.refill(now)
+        self.tokens -= 1
+
+    def block(self, until):
+        self.blocked_until = max(self.blocked_until, until)
+
+
+class EmailAutoRateScheduler:
+    def __init__(self, logging, rate_per_minute, burst=1, domain_rate_per_minute=0, domain_burst=1,
+                 retry_backoff_seconds=120, domain_concurrency=1):
+        self.logging = logging
+        self.global_bucket = EmailAutoTokenBucket(rate_per_minute / 60.0, burst)
+        self.domain_rate_per_second = domain_rate_per_minute / 60.0
+        self.domain_burst = domain_burst
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.domain_concurrency = max(1, domain_concurrency)
+        self.domain_buckets = {}
+        self.domain_active = defaultdict(int)
+        self.domain_parked = defaultdict(deque)
+        # Delay queue of (due, sequence, domain, job); work that is not yet due waits here
+        self.delay_queue = []
+        self.sequence = itertools.count()
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def logINFO(self, message):
+        self.logging.info(f"[{self.__class__.__name__}] {message}")
+
+    def logERROR(self, message):
+        self.logging.error(f"[{self.__class__.__name__}] {message}")
+
+    def logWARNING(self, message):
+        self.logging.warning(f"[{self.__class__.__name__}] {message}")
+
+    def domain_bucket(self, domain):
+        bucket = self.domain_buckets.get(domain)
+        if bucket is None:
+            bucket = EmailAutoTokenBucket(self.domain_rate_per_second, self.domain_burst)
+            self.domain_buckets[domain] = bucket
+        return bucket
+
+    def pending_count(self):
+        with self.condition:
+            return len(self.delay_queue) + sum(len(parked) for parked in self.domain_parked.values())
+
+    def has_work(self):
+        with self.condition:
+            return bool(self.delay_queue or self.domain_active or any(self.domain_parked.values()))
+
+    def schedule(self, job, domain, delay=0):
+        with self.condition:
+            heapq.heappush(self.delay_queue, (time.monotonic() + delay, next(self.sequence), domain, job))
+            self.condition.notify_all()
+
+    def backoff(self, domain, seconds=None):
+        # Hold back only this domain; recipients on other domains keep sending
+        seconds = self.retry_backoff_seconds if seconds is None else seconds
+        with self.condition:
+            self.domain_bucket(domain).block(time.monotonic() + seconds)
+        self.logWARNING(f"Backing off {domain} for {seconds} seconds.")
+
+    def backoff_all(self, seconds=None):
+        seconds = self.retry_backoff_seconds if seconds is None else seconds
+        with self.condition:
+            self.global_bucket.block(time.monotonic() + seconds)
+        self.logWARNING(f"Backing off all sends for {seconds} seconds.")
+
+    def release(self, domain):
+        with self.condition:
+            self.domain_active[domain] -= 1
+            if self.domain_active[domain] <= 0:
+                del self.domain_active[domain]
+            parked = self.domain_parked.get(domain)
+            if parked:
+                heapq.heappush(self.delay_queue, parked.popleft())
+            if parked is not None and not parked:
+                del self.domain_parked[domain]
+            self.condition.notify_all()
+
+    def acquire(self, domain):
+        # Blocking acquire for callers that send inline without queueing a job
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                wait = max(self.global_bucket.wait_time(now), self.domain_bucket(domain).wait_time(now))
+                if wait <= 0:
+                    self.global_bucket.consume(now)
+                    self.domain_bucket(domain).consume(now)
+                    return
+                self.condition.wait(wait)
+
+    def next_ready(self, block=True):
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                timeout = None
+                if self.delay_queue and self.delay_queue[0][0] <= now:
+                    entry = heapq.heappop(self.delay_queue)
+                    due, sequence, domain, job = entry
+                    if self.domain_active[domain] >= self.domain_concurrency:
+                        self.domain_parked[domain].append(entry)
+                        continue
+                    if not self.domain_active[domain]:
+                        del self.domain_active[domain]
+                    domain_wait = self.domain_bucket(domain).wait_time(now)
+                    if domain_wait > 0:
+                        heapq.heappush(self.delay_queue, (now + domain_wait, sequence, domain, job))
+                        continue
+                    global_wait = self.global_bucket.wait_time(now)
+                    if global_wait <= 0:
+                        self.global_bucket.consume(now)
+                        self.domain_bucket(domain).consume(now)
+                        self.domain_active[domain] += 1
+                        return job, domain
+                    heapq.heappush(self.delay_queue, entry)
+                    timeout = global_wait
+                elif self.delay_queue:
+                    timeout = self.delay_queue[0][0] - now
+                elif self.closed and not self.domain_active:
+                    return None
+                if not block:
+                    return None
+                self.condition.wait(timeout)
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
@@ -0,0 +1,74 @@
+import csv
+import hashlib
+import logging
+
+
+class EmailAutoRecipientDeduper:
+    def __init__(self, logging, email_column='emailId', strip_plus_tags=False):
+        self.logging = logging
+        self.email_column = email_column
+        self.strip_plus_tags = strip_plus_tags
+        self.total_rows = 0
+        self.unique_rows = 0
+        self.duplicate_rows = 0
+        self.blank_rows = 0
+
+    def logINFO(self, message):
+        self.logging.info(f"[{self.__class__.__name__}] {message}")
+
+    def logERROR(self, message):
+        self.logging.error(f"[{self.__class__.__name__}] {message}")
+
+    def logWARNING(self, message):
+        self.logging.warning(f"[{self.__class__.__name__}] {message}")
+
+    def normalize(self, email):
+        email = email.strip().lower()
+        if self.strip_plus_tags and '@' in email:
+            local_part, domain = email.rsplit('@', 1)
+            email = local_part.split('+', 1)[0] + '@' + domain
+        return email
+
+    def key(self, normalized_email):
+        # 8-byte digest as an int keeps the seen-set small whatever the address length
+        return int.from_bytes(hashlib.blake2b(normalized_email.encode('utf-8'), digest_size=8).digest(), 'big')
+
+    def dedupe_file(self, recipients_file, deduped_file, duplicates_report_file, encoding=None):
+        self.total_rows = 0
+        self.unique_rows = 0
+        self.duplicate_rows = 0
+        self.blank_rows = 0
+        first_seen_row = {}
+        # The deduped copy keeps the source encoding, since later stages read it back with the same one
+        with open(recipients_file, 'r', newline='', encoding=encoding) as source, \
+                open(deduped_file, 'w', newline='', encoding=encoding) as deduped, \
+                open(duplicates_report_file, 'w', newline='', encoding=encoding) as report:
+            reader = csv.DictReader(source)
+            fieldnames = reader.fieldnames or [self.email_column]
+            deduped_writer = csv.DictWriter(deduped, fieldnames=fieldnames, extrasaction='ignore')
+            report_writer = csv.DictWriter(report, fieldnames=['row', 'first_row', 'normalizedEmail'] + fieldnames,
+                                           extrasaction='ignore')
+            deduped_writer.writeheader()
+            report_writer.writeheader()
+            for row_number, row in enumerate(reader, start=2):
+                self.total_rows += 1
+                email = (row.get(self.email_column) or '').strip()
+                row[self.email_column] = email
+                normalized_email = self.normalize(email)
+                if not normalized_email:
+                    # Rows without an address are not repeats of each other; they are kept for validation to report
+                    self.blank_rows += 1
+                    deduped_writer.writerow(row)
+                    continue
+                key = self.key(normalized_email)
+                if key in first_seen_row:
+                    self.duplicate_rows += 1
+                    report_writer.writerow(dict(row, row=row_number, first_row=first_seen_row[key],
+                                                normalizedEmail=normalized_email))
+                    continue
+                first_seen_row[key] = row_number
+                self.unique_rows += 1
+                deduped_writer.writerow(row)
+        self.logINFO(f"Deduplicated {recipients_file}: {self.total_rows} rows, {self.unique_rows} unique, "
+                     f"{self.duplicate_rows} duplicates, {self.blank_rows} without an address.")
+        return self.unique_rows, self.duplicate_rows
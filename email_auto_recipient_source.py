@@ -0,0 +1,186 @@
+import csv
+import os
+import logging
+
+
+class EmailAutoRecipientSource:
+    REQUIRED_COLUMNS = ['fullName', 'emailId']
+    EMAIL_HEADERS = ['emailid', 'email', 'emailaddress', 'workemail', 'mail']
+    FULL_NAME_HEADERS = ['fullname', 'name', 'contactname']
+    FIRST_NAME_HEADERS = ['firstname', 'givenname']
+    LAST_NAME_HEADERS = ['lastname', 'surname', 'familyname']
+
+    def __init__(self, logging, file_path, column_map=None, chunk_size=1000, sheets=None, encoding=None,
+                 excel_cache=None, skip_invalid_sheets=False):
+        self.logging = logging
+        self.file_path = file_path
+        self.encoding = encoding
+        self.column_map = column_map or {}
+        self.chunk_size = max(1, chunk_size)
+        self.sheets = sheets
+        self.is_xlsx = os.path.splitext(file_path)[1].lower() in ('.xlsx', '.xlsm')
+        # Optional EmailAutoExcelCache; workbooks are then parsed once per content hash
+        self.excel_cache = excel_cache
+        # When set, a sheet without an email column is skipped (and listed here) instead of failing the workbook
+        self.skip_invalid_sheets = skip_invalid_sheets
+        self.skipped_sheets = []
+
+    def logINFO(self, message):
+        self.logging.info(f"[{self.__class__.__name__}] {message}")
+
+    def logERROR(self, message):
+        self.logging.error(f"[{self.__class__.__name__}] {message}")
+
+    def logWARNING(self, message):
+        self.logging.warning(f"[{self.__class__.__name__}] {message}")
+
+    @staticmethod
+    def parse_column_map(text):
+        # "fullName=Full Name;emailId=Email address" -> {'fullName': 'Full Name', 'emailId': 'Email address'}
+        column_map = {}
+        for item in (text or '').split(';'):
+            if '=' in item:
+                target, source = item.split('=', 1)
+                column_map[target.strip()] = source.strip()
+        return column_map
+
+    @staticmethod
+    def header_key(header):
+        return ''.join(ch for ch in str(header).lower() if ch.isalnum())
+
+    def build_mapper(self, headers):
+        headers = [('' if header is None else str(header).replace('\ufeff', '').strip()) for header in headers]
+        keys = [self.header_key(header) for header in headers]
+
+        def find(explicit, candidates):
+            if explicit is not None:
+                return headers.index(explicit) if explicit in headers else None
+            for candidate in candidates:
+                if candidate in keys:
+                    return keys.index(candidate)
+            return None
+
+        email_index = find(self.column_map.get('emailId'), self.EMAIL_HEADERS)
+        name_index = find(self.column_map.get('fullName'), self.FULL_NAME_HEADERS)
+        first_index = find(self.column_map.get('firstName'), self.FIRST_NAME_HEADERS)
+        last_index = find(self.column_map.get('lastName'), self.LAST_NAME_HEADERS)
+        if email_index is None:
+            raise ValueError(f"No email column found in {self.file_path}; headers: {headers}")
+        # Every other column keeps its header, so {{Job Title}} in a template reads the "Job Title" column
+        extra_columns = [(index, header) for index, header in enumerate(headers)
+                         if header and index not in (email_index, name_index) and header not in self.REQUIRED_COLUMNS
+                         and header not in headers[:index]]
+
+        def cell(values, index):
+            if index is None or index >= len(values) or values[index] is None:
+                return ''
+            return str(values[index]).strip()
+
+        def map_row(values):
+            if name_index is not None:
+                full_name = cell(values, name_index)
+            else:
+                full_name = ' '.join(part for part in (cell(values, first_index), cell(values, last_index)) if part)
+            row = {'fullName': full_name, 'emailId': cell(values, email_index)}
+            for index, name in extra_columns:
+                row[name] = cell(values, index)
+            return row
+
+        return map_row, self.REQUIRED_COLUMNS + [name for _, name in extra_columns]
+
+    def iter_tables(self):
+        # Yields (fieldnames, row iterator) per CSV file or XLSX sheet, both read lazily
+        if not self.is_xlsx:
+            with open(self.file_path, 'r', newline='', encoding=self.encoding) as file:
+                reader = csv.reader(file)
+                headers = next(reader, [])
+                map_row, fieldnames = self.build_mapper(headers)
+                yield fieldnames, (map_row(values) for values in reader if any(values))
+            return
+        if self.excel_cache:
+            yield from self.iter_sheet_tables(self.excel_cache.iter_sheet_rows(self.file_path))
+            return
+        from openpyxl import load_workbook
+        workbook = load_workbook(self.file_path, read_only=True, data_only=True)
+        try:
+            yield from self.iter_sheet_tables((sheet_name, workbook[sheet_name].iter_rows(values_only=True))
+                                              for sheet_name in workbook.sheetnames)
+        finally:
+            workbook.close()
+
+    def iter_sheet_tables(self, sheets):
+        for sheet_name, rows in sheets:
+            if self.sheets and sheet_name not in self.sheets:
+                continue
+            rows = iter(rows)
+            headers = next(rows, None)
+            while headers is not None and not any(headers):
+                headers = next(rows, None)
+            if headers is None:
+                continue
+            try:
+                map_row, fieldnames = self.build_mapper(headers)
+            except ValueError as e:
+                if not self.skip_invalid_sheets:
+                    raise
+                self.logWARNING(f"Skipping sheet '{sheet_name}': {e}")
+                self.skipped_sheets.append(sheet_name)
+                continue
+            self.logINFO(f"Streaming sheet '{sheet_name}' from {self.file_path}")
+            yield fieldnames, (map_row(values) for values in rows
+                               if any(value not in (None, '') for value in values))
+
+    def iter_chunks(self):
+        for _, rows in self.iter_tables():
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) >= self.chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+    def iter_rows(self):
+        for chunk in self.iter_chunks():
+            yield from chunk
+
+    def fieldnames(self):
+        for fieldnames, _ in self.iter_tables():
+            return fieldnames
+        return list(self.REQUIRED_COLUMNS)
+
+    def needs_conversion(self):
+        if self.is_xlsx or self.column_map:
+            return True
+        with open(self.file_path, 'r', newline='', encoding=self.encoding) as file:
+            headers = next(csv.reader(file), [])
+        return not all(column in headers for column in self.REQUIRED_COLUMNS)
+
+    def write_csv(self, output_file):
+        # Chunked copy into the campaign's fullName/emailId CSV; the workbook is never fully loaded
+        row_count = 0
+        fieldnames = None
+        writer = None
+        temp_file = output_file + '.tmp'
+        # Keep the source encoding so the campaign copy reads back the same way as a plain copy
+        with open(temp_file, 'w', newline='', encoding=self.encoding) as file:
+            for table_fieldnames, rows in self.iter_tables():
+                if writer is None:
+                    fieldnames = table_fieldnames
+                    writer = csv.DictWriter(file, fieldnames=fieldnames, extrasaction='ignore')
+                    writer.writeheader()
+                chunk = []
+                for row in rows:
+                    chunk.append(row)
+                    if len(chunk) >= self.chunk_size:
+                        writer.writerows(chunk)
+                        row_count += len(chunk)
+                        chunk = []
+                writer.writerows(chunk)
+                row_count += len(chunk)
+            if writer is None:
+                csv.writer(file).writerow(self.REQUIRED_COLUMNS)
+        os.replace(temp_file, output_file)
+        self.logINFO(f"Wrote {row_count} recipients from {self.file_path} to {output_file}")
+        return row_count
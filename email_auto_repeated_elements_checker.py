@@ -21,10 +21,10 @@ class RepeatedElementsChecker:
         duplicates = df[df.duplicated()]
         return duplicates
     
-    def count_duplicate_rows(self, csv_file):
+    def count_duplicate_rows(self, csv_file, encoding=None):
         """
         Count the number of duplicate rows in the CSV file.
         Returns the count of duplicate rows.
         """
-        df = pd.read_csv(csv_file)
+        df = pd.read_csv(csv_file, encoding=encoding)
         return df.duplicated().sum()
@@ -0,0 +1,168 @@
+import queue
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+
+class EmailAutoSendEngine:
+    def __init__(self, logging, email_sender, domain_email_counter, on_result, rate_scheduler,
+                 concurrency=4, max_retries=0, max_pending=None, metrics=None):
+        self.logging = logging
+        self.email_sender = email_sender
+        self.domain_email_counter = domain_email_counter
+        self.on_result = on_result
+        self.rate_scheduler = rate_scheduler
+        # A concurrency of 1 runs every send inline on the calling thread (the sequential path)
+        self.concurrency = max(1, concurrency)
+        self.inline = self.concurrency == 1
+        self.max_retries = max_retries
+        # Bound queued plus running jobs so the recipients file is never read far ahead
+        self.max_pending = max_pending or self.concurrency * 4
+        self.admitted = threading.BoundedSemaphore(self.max_pending)
+        self.condition = threading.Condition()
+        self.in_flight_emails = set()
+        self.results = queue.Queue()
+        # Optional EmailAutoMetrics receiving the time each job waits in the scheduler
+        self.metrics = metrics
+        if not self.inline:
+            self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='EmailAutoSend')
+            self.writer = threading.Thread(target=self.write_results, name='EmailAutoSendWriter', daemon=True)
+            self.dispatcher = threading.Thread(target=self.dispatch_ready, name='EmailAutoSendDispatcher', daemon=True)
+            self.writer.start()
+            self.dispatcher.start()
+
+    def logINFO(self, message):
+        self.logging.info(f"[{self.__class__.__name__}] {message}")
+
+    def logERROR(self, message):
+        self.logging.error(f"[{self.__class__.__name__}] {message}")
+
+    def logWARNING(self, message):
+        self.logging.warning(f"[{self.__class__.__name__}] {message}")
+
+    def wait_until_recorded(self, recipient_email):
+        # A repeated address must see the outcome of its earlier row, as in the sequential loop
+        if self.inline:
+            while recipient_email in self.in_flight_emails:
+                self.pump(block=True)
+            return
+        with self.condition:
+            while recipient_email in self.in_flight_emails:
+                self.condition.wait()
+
+    def submit(self, recipient_email, full_name, subject, body, attachment_path, domain_limit):
+        self.wait_until_recorded(recipient_email)
+        with self.condition:
+            self.in_flight_emails.add(recipient_email)
+        # The daily cap is decided in file order on the dispatching thread, whatever the concurrency
+        status = self.email_sender.check_domain_limit(recipient_email, full_name, domain_limit)
+        if status:
+            self.publish(recipient_email, full_name, status)
+            return
+        job = {
+            'recipient_email': recipient_email,
+            'full_name': full_name,
+            'subject': subject,
+            'body': body,
+            'attachment_path': attachment_path,
+            'retry_count': 0,
+            'queued_at': time.perf_counter()
+        }
+        if self.inline:
+            # Send whatever is already due, and block only once the delay queue is full
+            while not self.admitted.acquire(blocking=False):
+                self.pump(block=True)
+            self.rate_scheduler.schedule(job, recipient_email.split('@')[-1])
+            self.pump(block=False)
+        else:
+            self.admitted.acquire()
+            self.rate_scheduler.schedule(job, recipient_email.split('@')[-1])
+
+    def record_decided(self, recipient_email, full_name, status):
+        # Outcomes decided before sending (e.g. invalid addresses) go through the same single writer
+        self.wait_until_recorded(recipient_email)
+        with self.condition:
+            self.in_flight_emails.add(recipient_email)
+        self.publish(recipient_email, full_name, status)
+
+    def pump(self, block):
+        while True:
+            item = self.rate_scheduler.next_ready(block=block)
+            if item is None:
+                return
+            self.process_job(*item)
+            if block:
+                return
+
+    def dispatch_ready(self):
+        while True:
+            item = self.rate_scheduler.next_ready(block=True)
+            if item is None:
+                break
+            self.executor.submit(self.process_job, *item)
+
+    def process_job(self, job, domain):
+        recipient_email = job['recipient_email']
+        full_name = job['full_name']
+        if self.metrics:
+            self.metrics.observe('scheduler_wait', time.perf_counter() - job['queued_at'])
+        try:
+            status = self.email_sender.deliver_email(recipient_email, full_name, job['subject'], job['body'],
+                                                     job['attachment_path'])
+        except Exception as e:
+            error_message = f"Error sending email to {recipient_email}: {e}"
+            status = self.email_sender.handle_send_error(recipient_email, full_name, error_message)
+        status['retry_count'] = job['retry_count']
+        try:
+            # Failures back off this domain in the scheduler instead of sleeping the whole run
+            self.email_sender.pause_after(status, recipient_email)
+            if status['send_status'] == 'failure' and job['retry_count'] < self.max_retries:
+                job['retry_count'] += 1
+                job['queued_at'] = time.perf_counter()
+                self.logWARNING(f"Retrying {recipient_email} (attempt {job['retry_count']}/{self.max_retries}).")
+                self.rate_scheduler.schedule(job, domain)
+                return
+            self.admitted.release()
+            self.publish(recipient_email, full_name, status)
+        finally:
+            self.rate_scheduler.release(domain)
+
+    def publish(self, recipient_email, full_name, status):
+        if self.inline:
+            self.record(recipient_email, full_name, status)
+        else:
+            self.results.put((recipient_email, full_name, status))
+
+    def record(self, recipient_email, full_name, status):
+        try:
+            if status['send_status'] == 'success':
+                self.domain_email_counter.maybe_flush()
+            self.on_result(recipient_email, full_name, status)
+        except Exception as e:
+            self.logERROR(f"Failed to record status for {recipient_email}: {e}")
+        finally:
+            with self.condition:
+                self.in_flight_emails.discard(recipient_email)
+                self.condition.notify_all()
+
+    def write_results(self):
+        # Single writer: every outcome reaches the status store from this thread only
+        while True:
+            item = self.results.get()
+            if item is None:
+                break
+            self.record(*item)
+
+    def close(self):
+        self.rate_scheduler.close()
+        if self.inline:
+            self.pump(block=False)
+            while self.rate_scheduler.has_work():
+                self.pump(block=True)
+        else:
+            self.dispatcher.join()
+            self.executor.shutdown(wait=True)
+            self.results.put(None)
+            self.writer.join()
+        self.logINFO("Send engine drained.")
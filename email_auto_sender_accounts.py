@@ -0,0 +1,165 @@
+import csv
+import os
+import threading
+import time
+from datetime import datetime
+import logging
+
+from email_auto_smtp_pool import EmailAutoSMTPPool
+from email_auto_rate_scheduler import EmailAutoTokenBucket
+
+
+class EmailAutoSenderAccount:
+    def __init__(self, sender_email, smtp_pool, daily_quota=0, rate_per_minute=0, burst=1):
+        self.sender_email = sender_email
+        self.smtp_pool = smtp_pool
+        # A daily quota of 0 means no per-account cap
+        self.daily_quota = daily_quota
+        self.bucket = EmailAutoTokenBucket(rate_per_minute / 60.0, burst)
+        self.sent_today = 0
+        self.in_flight = 0
+
+    def has_quota(self):
+        # In-flight messages hold quota so concurrent sends cannot overshoot it
+        return not self.daily_quota or self.sent_today + self.in_flight < self.daily_quota
+
+    def quota_exhausted(self):
+        # Only confirmed sends spend the quota for good; in-flight messages may still fail and hand it back
+        return bool(self.daily_quota) and self.sent_today >= self.daily_quota
+
+    def load(self):
+        used = self.sent_today / self.daily_quota if self.daily_quota else 0.0
+        return self.in_flight, used
+
+
+class EmailAutoSenderAccountPool:
+    ACCOUNT_FIELDS = ['sender_email', 'sender_password', 'smtp_host', 'smtp_port', 'smtp_security', 'daily_quota',
+                      'rate_per_minute', 'burst']
+    ACCOUNT_COUNT_FIELDS = ['sender_email', 'date', 'count']
+    # Outcomes that take an account out of rotation for the cool-down period
+    COOLDOWN_CODES = ('SMTPAuthenticationError', 'SMTPQuotaExceeded')
+
+    def __init__(self, logging, cooldown_seconds=900, account_count_file=None, flush_every_updates=50):
+        self.logging = logging
+        self.cooldown_seconds = cooldown_seconds
+        self.account_count_file = account_count_file
+        self.flush_every_updates = flush_every_updates
+        self.accounts = []
+        self.pending_updates = 0
+        self.current_day = datetime.now().strftime('%Y-%m-%d')
+        self.condition = threading.Condition()
+
+    def logINFO(self, message):
+        self.logging.info(f"[{self.__class__.__name__}] {message}")
+
+    def logERROR(self, message):
+        self.logging.error(f"[{self.__class__.__name__}] {message}")
+
+    def logWARNING(self, message):
+        self.logging.warning(f"[{self.__class__.__name__}] {message}")
+
+    def add_account(self, account):
+        self.accounts.append(account)
+
+    def load_accounts_file(self, accounts_file, default_host, default_port, default_rate_per_minute,
+                           pool_size=1, max_messages_per_connection=50, max_connection_age=300, default_security='ssl',
+                           metrics=None):
+        # One row per sender identity; a sender_password_env column names an env var instead of a literal password
+        with open(accounts_file, 'r', newline='') as file:
+            for row in csv.DictReader(file):
+                sender_email = (row.get('sender_email') or '').strip()
+                if not sender_email:
+                    continue
+                sender_password = row.get('sender_password') or os.getenv((row.get('sender_password_env') or '').strip(), '')
+                host = (row.get('smtp_host') or '').strip() or default_host
+                port = int(row.get('smtp_port') or default_port)
+                security = (row.get('smtp_security') or '').strip().lower() or default_security
+                smtp_pool = EmailAutoSMTPPool(self.logging, host, port, sender_email, sender_password, pool_size,
+                                              max_messages_per_connection, max_connection_age, security=security,
+                                              metrics=metrics)
+                self.add_account(EmailAutoSenderAccount(sender_email, smtp_pool,
+                                                        int(row.get('daily_quota') or 0),
+                                                        float(row.get('rate_per_minute') or default_rate_per_minute),
+                                                        int(row.get('burst') or 1)))
+        self.logINFO(f"Loaded {len(self.accounts)} sender accounts from {accounts_file}")
+        self.read_account_counts()
+        return self.accounts
+
+    def read_account_counts(self):
+        if not self.account_count_file or not os.path.exists(self.account_count_file):
+            return
+        accounts = {account.sender_email: account for account in self.accounts}
+        with open(self.account_count_file, 'r', newline='') as file:
+            for row in csv.DictReader(file):
+                account = accounts.get(row['sender_email'])
+                if account and row['date'] == self.current_day:
+                    account.sent_today = int(row['count'])
+
+    def write_account_counts(self):
+        if not self.account_count_file:
+            return
+        with self.condition:
+            rows = [{'sender_email': account.sender_email, 'date': self.current_day, 'count': account.sent_today}
+                    for account in self.accounts]
+            self.pending_updates = 0
+        temp_file = self.account_count_file + '.tmp'
+        try:
+            with open(temp_file, 'w', newline='') as file:
+                writer = csv.DictWriter(file, fieldnames=self.ACCOUNT_COUNT_FIELDS)
+                writer.writeheader()
+                writer.writerows(rows)
+            os.replace(temp_file, self.account_count_file)
+        except (FileNotFoundError, PermissionError) as e:
+            self.logERROR(f"Failed to write sender account counts: {e}")
+
+    def roll_over_day(self):
+        today = datetime.now().strftime('%Y-%m-%d')
+        if today != self.current_day:
+            self.current_day = today
+            for account in self.accounts:
+                account.sent_today = 0
+            self.logINFO(f"Day rolled over to {today}; sender account quotas reset.")
+
+    def acquire(self):
+        # Least-loaded account that still has quota and a token; None once every account is spent for the day
+        with self.condition:
+            while True:
+                self.roll_over_day()
+                candidates = [account for account in self.accounts if account.has_quota()]
+                if not candidates:
+                    if all(account.quota_exhausted() for account in self.accounts):
+                        return None
+                    # The rest of the quota is held by messages in flight; release() wakes us when one finishes
+                    self.condition.wait()
+                    continue
+                now = time.monotonic()
+                waits = {id(account): account.bucket.wait_time(now) for account in candidates}
+                ready = [account for account in candidates if waits[id(account)] <= 0]
+                if ready:
+                    account = min(ready, key=EmailAutoSenderAccount.load)
+                    account.bucket.consume(now)
+                    account.in_flight += 1
+                    return account
+                self.condition.wait(min(waits.values()))
+
+    def release(self, account, status):
+        flush = False
+        with self.condition:
+            account.in_flight -= 1
+            delivery_status_code = status['delivery_status_code']
+            if delivery_status_code == 'Delivered':
+                account.sent_today += 1
+                self.pending_updates += 1
+                flush = self.pending_updates >= self.flush_every_updates
+            elif delivery_status_code in self.COOLDOWN_CODES:
+                account.bucket.block(time.monotonic() + self.cooldown_seconds)
+                self.logWARNING(f"{account.sender_email} returned {delivery_status_code}; "
+                                f"out of rotation for {self.cooldown_seconds} seconds.")
+            self.condition.notify_all()
+        if flush:
+            self.write_account_counts()
+
+    def close(self):
+        self.write_account_counts()
+        for account in self.accounts:
+            account.smtp_pool.close()
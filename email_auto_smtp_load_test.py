@@ -0,0 +1,144 @@
+import argparse
+import os
+import tempfile
+import threading
+import time
+import logging
+from collections import Counter
+
+from email_auto_domain_email_counter import EmailAutoDomainEmailCounter
+from email_auto_email_sender import EmailAutoEmailSender
+from email_auto_rate_scheduler import EmailAutoRateScheduler
+from email_auto_send_engine import EmailAutoSendEngine
+from email_auto_smtp_pool import EmailAutoSMTPPool
+from email_auto_smtp_sink import EmailAutoSMTPSink
+
+
+class EmailAutoSMTPLoadTest:
+    def __init__(self, logging, recipients=10000, concurrency=8, domains=100, host=None, port=0, security='none',
+                 max_messages_per_connection=0, sink_options=None):
+        self.logging = logging
+        self.recipients = recipients
+        self.concurrency = concurrency
+        self.domains = max(1, domains)
+        # Without a host, an in-process EmailAutoSMTPSink is started on a free local port
+        self.host = host
+        self.port = port
+        self.security = security
+        self.max_messages_per_connection = max_messages_per_connection
+        self.sink_options = sink_options or {}
+        self.latencies = []
+        self.outcomes = Counter()
+        self.lock = threading.Lock()
+
+    def logINFO(self, message):
+        self.logging.info(f"[{self.__class__.__name__}] {message}")
+
+    def logERROR(self, message):
+        self.logging.error(f"[{self.__class__.__name__}] {message}")
+
+    def logWARNING(self, message):
+        self.logging.warning(f"[{self.__class__.__name__}] {message}")
+
+    @staticmethod
+    def percentile(sorted_values, percent):
+        if not sorted_values:
+            return 0.0
+        index = int(round(percent / 100.0 * (len(sorted_values) - 1)))
+        return sorted_values[index]
+
+    def timed(self, deliver_email):
+        def deliver(*args):
+            started_at = time.perf_counter()
+            status = deliver_email(*args)
+            with self.lock:
+                self.latencies.append(time.perf_counter() - started_at)
+            return status
+        return deliver
+
+    def on_result(self, recipient_email, full_name, status):
+        self.outcomes[status['delivery_status_code']] += 1
+
+    def run(self):
+        sink = None
+        if self.host is None:
+            sink = EmailAutoSMTPSink(self.logging, '127.0.0.1', 0, log_messages=False, **self.sink_options)
+            self.host, self.port = sink.start()
+        with tempfile.TemporaryDirectory() as work_directory:
+            smtp_pool = EmailAutoSMTPPool(self.logging, self.host, self.port, 'loadtest@emailauto.test', 'loadtest',
+                                          self.concurrency, self.max_messages_per_connection, 0,
+                                          security=self.security)
+            # No pacing and no failure backoff: the test measures the send path, not the configured rates
+            rate_scheduler = EmailAutoRateScheduler(self.logging, 0, 1, 0, 1, 0, self.concurrency)
+            domain_email_counter = EmailAutoDomainEmailCounter(self.logging, None,
+                                                               os.path.join(work_directory, 'domainEmailCount.csv'))
+            sender = EmailAutoEmailSender(self.logging, 'loadtest@emailauto.test', 'loadtest', smtp_pool,
+                                          rate_scheduler, None, domain_email_counter)
+            sender.deliver_email = self.timed(sender.deliver_email)
+            engine = EmailAutoSendEngine(self.logging, sender, domain_email_counter, self.on_result, rate_scheduler,
+                                         self.concurrency)
+            started_at = time.perf_counter()
+            for index in range(self.recipients):
+                engine.submit(f"user{index}@domain{index % self.domains}.test", f"Load Test {index}",
+                              f"Load test message {index}", "Hello from the EmailAutomator load test.",
+                              None, self.recipients)
+            engine.close()
+            elapsed = time.perf_counter() - started_at
+            sender.close()
+        if sink:
+            sink.stop()
+        latencies = sorted(self.latencies)
+        report = {
+            'messages': self.recipients,
+            'concurrency': self.concurrency,
+            'elapsed_seconds': round(elapsed, 3),
+            'messages_per_second': round(self.recipients / elapsed, 1) if elapsed else 0.0,
+            'p50_ms': round(self.percentile(latencies, 50) * 1000, 2),
+            'p99_ms': round(self.percentile(latencies, 99) * 1000, 2),
+            'outcomes': dict(self.outcomes)
+        }
+        self.logINFO(f"Load test finished: {report}")
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline SMTP throughput test against the local sink.")
+    parser.add_argument('--recipients', type=int, default=10000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--domains', type=int, default=100)
+    parser.add_argument('--host', default=None, help="Send to an already running SMTP server instead of a built-in sink")
+    parser.add_argument('--port', type=int, default=2525)
+    parser.add_argument('--security', default='none', choices=EmailAutoSMTPPool.SECURITY_MODES)
+    parser.add_argument('--max-messages-per-connection', type=int, default=0)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--temp-fail-rate', type=float, default=0.0)
+    parser.add_argument('--perm-fail-rate', type=float, default=0.0)
+    parser.add_argument('--auth-fail-rate', type=float, default=0.0)
+    parser.add_argument('--drop-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
+    sink_options = {
+        'latency_ms': args.latency_ms,
+        'jitter_ms': args.jitter_ms,
+        'temp_fail_rate': args.temp_fail_rate,
+        'perm_fail_rate': args.perm_fail_rate,
+        'auth_fail_rate': args.auth_fail_rate,
+        'drop_rate': args.drop_rate,
+        'seed': args.seed
+    }
+    load_test = EmailAutoSMTPLoadTest(logging, args.recipients, args.concurrency, args.domains, args.host,
+                                      args.port, args.security, args.max_messages_per_connection, sink_options)
+    report = load_test.run()
+    print(f"Messages: {report['messages']} with concurrency {report['concurrency']}")
+    print(f"Elapsed: {report['elapsed_seconds']} seconds")
+    print(f"Throughput: {report['messages_per_second']} messages/second")
+    print(f"Latency p50: {report['p50_ms']} ms, p99: {report['p99_ms']} ms")
+    for code, count in sorted(report['outcomes'].items()):
+        print(f"Delivery status {code}: {count}")
+
+
+if __name__ == "__main__":
+    main()
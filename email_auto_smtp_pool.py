@@ -0,0 +1,179 @@
+import smtplib
+import threading
+import time
+import logging
+
+
+class EmailAutoSMTPSession:
+    def __init__(self, server):
+        self.server = server
+        self.created_at = time.monotonic()
+        self.last_used_at = self.created_at
+        self.message_count = 0
+
+
+class EmailAutoSMTPPool:
+    HEALTH_CHECK_IDLE_SECONDS = 5
+    # ssl: implicit TLS (port 465), starttls: upgrade a plain connection (port 587), none: plain SMTP (local sinks)
+    SECURITY_MODES = ('ssl', 'starttls', 'none')
+
+    def __init__(self, logging, host, port, sender_email, sender_password,
+                 pool_size=1, max_messages_per_connection=50, max_connection_age=300, timeout=60, security='ssl',
+                 metrics=None):
+        self.logging = logging
+        self.host = host
+        self.port = port
+        self.sender_email = sender_email
+        self.sender_password = sender_password
+        self.pool_size = max(1, pool_size)
+        self.max_messages_per_connection = max_messages_per_connection
+        self.max_connection_age = max_connection_age
+        self.timeout = timeout
+        if security not in self.SECURITY_MODES:
+            raise ValueError(f"Unknown SMTP security mode '{security}', expected one of {self.SECURITY_MODES}")
+        self.security = security
+        # Optional EmailAutoMetrics receiving connect, login and send timings
+        self.metrics = metrics
+        self.idle_sessions = []
+        self.open_count = 0
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def logINFO(self, message):
+        self.logging.info(f"[{self.__class__.__name__}] {message}")
+
+    def logERROR(self, message):
+        self.logging.error(f"[{self.__class__.__name__}] {message}")
+
+    def logWARNING(self, message):
+        self.logging.warning(f"[{self.__class__.__name__}] {message}")
+
+    def open_session(self):
+        self.logINFO(f"Opening SMTP connection to {self.host}:{self.port} ({self.security})")
+        started_at = time.perf_counter()
+        if self.security == 'ssl':
+            server = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.security == 'starttls':
+                server.starttls()
+            connected_at = time.perf_counter()
+            server.login(self.sender_email, self.sender_password)
+        except Exception:
+            self.close_server(server)
+            raise
+        if self.metrics:
+            self.metrics.observe('smtp_connect', connected_at - started_at)
+            self.metrics.observe('smtp_login', time.perf_counter() - connected_at)
+            self.metrics.increment('smtp_connections')
+        return EmailAutoSMTPSession(server)
+
+    def close_server(self, server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def is_expired(self, session):
+        if self.max_messages_per_connection and session.message_count >= self.max_messages_per_connection:
+            return True
+        if self.max_connection_age and time.monotonic() - session.created_at >= self.max_connection_age:
+            return True
+        return False
+
+    def is_healthy(self, session):
+        # Only probe sessions that sat idle long enough for the server to drop them
+        if time.monotonic() - session.last_used_at < self.HEALTH_CHECK_IDLE_SECONDS:
+            return True
+        try:
+            code, _ = session.server.noop()
+            return code == 250
+        except Exception:
+            return False
+
+    def discard(self, session):
+        self.close_server(session.server)
+        with self.condition:
+            self.open_count -= 1
+            self.condition.notify()
+
+    def acquire(self):
+        while True:
+            with self.condition:
+                while not self.idle_sessions and self.open_count >= self.pool_size:
+                    self.condition.wait()
+                if self.idle_sessions:
+                    session = self.idle_sessions.pop()
+                else:
+                    session = None
+                    self.open_count += 1
+            if session is None:
+                try:
+                    return self.open_session()
+                except Exception:
+                    with self.condition:
+                        self.open_count -= 1
+                        self.condition.notify()
+                    raise
+            if self.is_expired(session) or not self.is_healthy(session):
+                self.logINFO("Recycling expired or unhealthy SMTP connection.")
+                self.discard(session)
+                continue
+            return session
+
+    def release(self, session):
+        session.last_used_at = time.monotonic()
+        if self.closed or self.is_expired(session):
+            self.discard(session)
+            return
+        with self.condition:
+            self.idle_sessions.append(session)
+            self.condition.notify()
+
+    def reset(self, session):
+        # Clear any half-finished transaction so the session can be reused
+        try:
+            code, _ = session.server.rset()
+            return code == 250
+        except Exception:
+            return False
+
+    def send_message(self, message):
+        for attempt in range(2):
+            session = self.acquire()
+            started_at = time.perf_counter()
+            try:
+                session.server.send_message(message)
+            except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+                self.discard(session)
+                if attempt == 0:
+                    self.logWARNING(f"SMTP connection dropped ({e}), reconnecting.")
+                    continue
+                raise
+            except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+                if self.reset(session):
+                    self.release(session)
+                else:
+                    self.discard(session)
+                raise
+            except Exception:
+                self.discard(session)
+                raise
+            if self.metrics:
+                self.metrics.observe('smtp_send', time.perf_counter() - started_at)
+            session.message_count += 1
+            self.release(session)
+            return
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            sessions = self.idle_sessions
+            self.idle_sessions = []
+        for session in sessions:
+            self.discard(session)
+        self.logINFO("SMTP connection pool closed.")
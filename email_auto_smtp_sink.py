@@ -0,0 +1,227 @@
+import argparse
+import base64
+import random
+import socketserver
+import threading
+import time
+import logging
+from collections import Counter
+
+
+class EmailAutoSMTPSinkHandler(socketserver.StreamRequestHandler):
+    MAX_LINE = 65536
+
+    def reply(self, line):
+        self.wfile.write((line + '\r\n').encode('utf-8'))
+
+    def read_line(self):
+        line = self.rfile.readline(self.MAX_LINE)
+        if not line:
+            return None
+        return line.decode('utf-8', 'replace').rstrip('\r\n')
+
+    def read_data(self):
+        size = 0
+        while True:
+            line = self.rfile.readline(self.MAX_LINE)
+            if not line:
+                return None
+            if line in (b'.\r\n', b'.\n'):
+                return size
+            size += len(line)
+
+    def authenticate(self, argument):
+        # Accepts AUTH PLAIN and AUTH LOGIN, with or without the initial response
+        mechanism, _, initial_response = argument.partition(' ')
+        mechanism = mechanism.upper()
+        if mechanism == 'PLAIN':
+            if not initial_response:
+                self.reply('334 ')
+                initial_response = self.read_line()
+        elif mechanism == 'LOGIN':
+            if not initial_response:
+                self.reply('334 ' + base64.b64encode(b'Username:').decode())
+                initial_response = self.read_line()
+            self.reply('334 ' + base64.b64encode(b'Password:').decode())
+            if self.read_line() is None:
+                return False
+        else:
+            self.reply('504 5.5.4 Unrecognized authentication type')
+            return True
+        if initial_response is None:
+            return False
+        if self.server.sink.inject('auth_fail'):
+            self.reply('535 5.7.8 Authentication credentials invalid')
+        else:
+            self.reply('235 2.7.0 Authentication successful')
+        return True
+
+    def handle(self):
+        sink = self.server.sink
+        self.reply(f"220 {sink.hostname} EmailAutoSMTPSink ready")
+        mail_from = None
+        recipients = []
+        while True:
+            command = self.read_line()
+            if command is None:
+                return
+            verb, _, argument = command.partition(' ')
+            verb = verb.upper()
+            if verb == 'EHLO':
+                self.reply(f"250-{sink.hostname}")
+                self.reply('250-AUTH PLAIN LOGIN')
+                self.reply('250 8BITMIME')
+            elif verb == 'HELO':
+                self.reply(f"250 {sink.hostname}")
+            elif verb == 'AUTH':
+                if not self.authenticate(argument):
+                    return
+            elif verb == 'MAIL':
+                mail_from = argument.partition(':')[2].strip()
+                recipients = []
+                self.reply('250 2.1.0 OK')
+            elif verb == 'RCPT':
+                recipients.append(argument.partition(':')[2].strip())
+                self.reply('250 2.1.5 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                size = self.read_data()
+                if size is None:
+                    return
+                outcome = sink.outcome()
+                sink.delay()
+                if outcome == 'dropped':
+                    sink.record(outcome, mail_from, recipients, size)
+                    return
+                if outcome == 'temporary_failure':
+                    self.reply('451 4.3.0 Injected temporary failure, try again later')
+                elif outcome == 'permanent_failure':
+                    self.reply('554 5.0.0 Injected permanent failure')
+                else:
+                    self.reply('250 2.0.0 OK queued')
+                sink.record(outcome, mail_from, recipients, size)
+                mail_from = None
+                recipients = []
+            elif verb == 'RSET':
+                mail_from = None
+                recipients = []
+                self.reply('250 2.0.0 OK')
+            elif verb == 'NOOP':
+                self.reply('250 2.0.0 OK')
+            elif verb == 'QUIT':
+                self.reply('221 2.0.0 Bye')
+                return
+            else:
+                self.reply('502 5.5.2 Command not implemented')
+
+
+class EmailAutoSMTPSinkServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class EmailAutoSMTPSink:
+    def __init__(self, logging, host='127.0.0.1', port=2525, latency_ms=0, jitter_ms=0, temp_fail_rate=0.0,
+                 perm_fail_rate=0.0, auth_fail_rate=0.0, drop_rate=0.0, seed=None, log_messages=True):
+        self.logging = logging
+        self.host = host
+        self.port = port
+        self.hostname = 'emailauto.sink'
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.temp_fail_rate = temp_fail_rate
+        self.perm_fail_rate = perm_fail_rate
+        self.auth_fail_rate = auth_fail_rate
+        self.drop_rate = drop_rate
+        self.log_messages = log_messages
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.outcome_counts = Counter()
+        self.server = None
+        self.thread = None
+
+    def logINFO(self, message):
+        self.logging.info(f"[{self.__class__.__name__}] {message}")
+
+    def logERROR(self, message):
+        self.logging.error(f"[{self.__class__.__name__}] {message}")
+
+    def logWARNING(self, message):
+        self.logging.warning(f"[{self.__class__.__name__}] {message}")
+
+    def inject(self, fault):
+        rate = self.auth_fail_rate if fault == 'auth_fail' else 0.0
+        with self.lock:
+            return rate > 0 and self.random.random() < rate
+
+    def outcome(self):
+        # One draw per message decides between a dropped connection, a 4xx, a 5xx and acceptance
+        with self.lock:
+            draw = self.random.random()
+        for outcome, rate in (('dropped', self.drop_rate), ('temporary_failure', self.temp_fail_rate),
+                              ('permanent_failure', self.perm_fail_rate)):
+            if draw < rate:
+                return outcome
+            draw -= rate
+        return 'accepted'
+
+    def delay(self):
+        latency_ms = self.latency_ms
+        if self.jitter_ms:
+            with self.lock:
+                latency_ms += self.random.uniform(0, self.jitter_ms)
+        if latency_ms > 0:
+            time.sleep(latency_ms / 1000.0)
+
+    def record(self, outcome, mail_from, recipients, size):
+        with self.lock:
+            self.outcome_counts[outcome] += 1
+        if self.log_messages:
+            self.logINFO(f"{outcome}: {mail_from} -> {', '.join(recipients)} ({size} bytes)")
+
+    def start(self):
+        self.server = EmailAutoSMTPSinkServer((self.host, self.port), EmailAutoSMTPSinkHandler)
+        self.server.sink = self
+        # Port 0 asks the OS for a free port; report the one actually bound
+        self.host, self.port = self.server.server_address[:2]
+        self.thread = threading.Thread(target=self.server.serve_forever, name='EmailAutoSMTPSink', daemon=True)
+        self.thread.start()
+        self.logINFO(f"SMTP sink listening on {self.host}:{self.port}")
+        return self.host, self.port
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.thread.join()
+            self.server = None
+        self.logINFO(f"SMTP sink stopped: {dict(self.outcome_counts)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local SMTP sink for offline load tests, with latency and fault injection.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=2525)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--temp-fail-rate', type=float, default=0.0, help="Share of messages answered with 451")
+    parser.add_argument('--perm-fail-rate', type=float, default=0.0, help="Share of messages answered with 554")
+    parser.add_argument('--auth-fail-rate', type=float, default=0.0, help="Share of logins answered with 535")
+    parser.add_argument('--drop-rate', type=float, default=0.0, help="Share of messages whose connection is dropped")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    sink = EmailAutoSMTPSink(logging, args.host, args.port, args.latency_ms, args.jitter_ms, args.temp_fail_rate,
+                             args.perm_fail_rate, args.auth_fail_rate, args.drop_rate, args.seed)
+    sink.start()
+    print(f"SMTP sink listening on {sink.host}:{sink.port}; press Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        sink.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import argparse
+import csv
+import glob
+import os
+import sqlite3
+import threading
+import logging
+from email_auto_status_journal import EmailAutoStatusJournal
+
+
+class EmailAutoSQLiteStore:
+    EMAIL_SEND_STATUS_FIELDS = ['emailId', 'FullName', 'timestamp', 'send_status', 'delivery_status_code', 'retry_count', 'error_message', 'delivery_duration']
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS send_status (
+            campaign TEXT NOT NULL,
+            emailId TEXT NOT NULL,
+            FullName TEXT,
+            timestamp TEXT,
+            send_status TEXT,
+            delivery_status_code TEXT,
+            retry_count INTEGER DEFAULT 0,
+            error_message TEXT,
+            delivery_duration TEXT,
+            PRIMARY KEY (campaign, emailId)
+        );
+        CREATE INDEX IF NOT EXISTS idx_send_status_status ON send_status (campaign, send_status);
+        CREATE TABLE IF NOT EXISTS domain_email_count (
+            domain TEXT PRIMARY KEY,
+            date TEXT NOT NULL,
+            count INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_domain_email_count_date ON domain_email_count (date);
+        CREATE TABLE IF NOT EXISTS blacklist_domains (
+            domain TEXT PRIMARY KEY
+        );
+    """
+
+    def __init__(self, logging, db_file):
+        self.logging = logging
+        self.db_file = db_file
+        self.lock = threading.RLock()
+        # The send engine records outcomes from its writer thread, so share one guarded connection
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        self.logINFO(f"Opened state database: {db_file}")
+
+    def logINFO(self, message):
+        self.logging.info(f"[{self.__class__.__name__}] {message}")
+
+    def logERROR(self, message):
+        self.logging.error(f"[{self.__class__.__name__}] {message}")
+
+    def logWARNING(self, message):
+        self.logging.warning(f"[{self.__class__.__name__}] {message}")
+
+    @staticmethod
+    def campaign_name(email_send_status_file):
+        file_name = os.path.basename(email_send_status_file)
+        if file_name.endswith('_SendStatus.csv'):
+            return file_name[:-len('_SendStatus.csv')]
+        return os.path.splitext(file_name)[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def read_send_status(self, campaign):
+        email_send_status_dict = {}
+        with self.lock:
+            cursor = self.conn.execute(
+                "SELECT emailId, FullName, timestamp, send_status, delivery_status_code, retry_count, "
+                "error_message, delivery_duration FROM send_status WHERE campaign = ?", (campaign,))
+            for row in cursor:
+                email_send_status_dict[row[0]] = {
+                    'FullName': row[1],
+                    'timestamp': row[2],
+                    'send_status': row[3],
+                    'delivery_status_code': row[4],
+                    'retry_count': row[5],
+                    'error_message': row[6],
+                    'delivery_duration': row[7]
+                }
+        return email_send_status_dict
+
+    def status_params(self, campaign, email, data):
+        return (campaign, email, data['FullName'], data['timestamp'], data['send_status'],
+                data['delivery_status_code'], int(data['retry_count']), data['error_message'],
+                data['delivery_duration'])
+
+    def upsert_send_status(self, campaign, email, data):
+        self.upsert_send_statuses(campaign, [(email, data)])
+
+    def upsert_send_statuses(self, campaign, items):
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO send_status VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (campaign, emailId) DO UPDATE SET FullName = excluded.FullName, "
+                "timestamp = excluded.timestamp, send_status = excluded.send_status, "
+                "delivery_status_code = excluded.delivery_status_code, retry_count = excluded.retry_count, "
+                "error_message = excluded.error_message, delivery_duration = excluded.delivery_duration",
+                (self.status_params(campaign, email, data) for email, data in items))
+
+    def read_domain_email_count(self):
+        with self.lock:
+            return {domain: {'date': date, 'count': count}
+                    for domain, date, count in self.conn.execute("SELECT domain, date, count FROM domain_email_count")}
+
+    def write_domain_email_count(self, domain_email_count):
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO domain_email_count (domain, date, count) VALUES (?, ?, ?) "
+                "ON CONFLICT (domain) DO UPDATE SET date = excluded.date, count = excluded.count",
+                ((domain, data['date'], data['count']) for domain, data in domain_email_count.items()))
+
+    def read_blacklist_domains(self):
+        with self.lock:
+            return {row[0] for row in self.conn.execute("SELECT domain FROM blacklist_domains")}
+
+    def add_blacklist_domains(self, domains):
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO blacklist_domains (domain) VALUES (?)",
+                                  ((domain,) for domain in domains))
+
+    def import_send_status_file(self, email_send_status_file):
+        # Replay the file plus any leftover journal, exactly as EmailAutoCSVManager would read it
+        journal = EmailAutoStatusJournal(self.logging, email_send_status_file, self.EMAIL_SEND_STATUS_FIELDS)
+        email_send_status_dict = journal.load({})
+        self.upsert_send_statuses(self.campaign_name(email_send_status_file), email_send_status_dict.items())
+        return len(email_send_status_dict)
+
+    def import_domain_email_count_file(self, domain_email_count_file):
+        domain_email_count = {}
+        with open(domain_email_count_file, 'r', newline='') as file:
+            for row in csv.DictReader(file):
+                domain_email_count[row['domain']] = {'date': row['date'], 'count': int(row['count'])}
+        self.write_domain_email_count(domain_email_count)
+        return len(domain_email_count)
+
+    def import_blacklist_file(self, blacklist_file):
+        with open(blacklist_file, 'r') as file:
+            domains = {line.strip() for line in file if line.strip()}
+        self.add_blacklist_domains(domains)
+        return len(domains)
+
+    def export_send_status_file(self, campaign, email_send_status_file):
+        email_send_status_dict = self.read_send_status(campaign)
+        temp_file = email_send_status_file + '.tmp'
+        with open(temp_file, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=self.EMAIL_SEND_STATUS_FIELDS)
+            writer.writeheader()
+            for email, data in email_send_status_dict.items():
+                writer.writerow(dict(data, emailId=email))
+        os.replace(temp_file, email_send_status_file)
+        return len(email_send_status_dict)
+
+    def export_domain_email_count_file(self, domain_email_count_file):
+        domain_email_count = self.read_domain_email_count()
+        with open(domain_email_count_file, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=['domain', 'date', 'count'])
+            writer.writeheader()
+            for domain, data in domain_email_count.items():
+                writer.writerow({'domain': domain, 'date': data['date'], 'count': data['count']})
+        return len(domain_email_count)
+
+    def export_blacklist_file(self, blacklist_file):
+        domains = sorted(self.read_blacklist_domains())
+        with open(blacklist_file, 'w') as file:
+            for domain in domains:
+                file.write(domain + '\n')
+        return len(domains)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate campaign state between CSV files and the SQLite state store.")
+    parser.add_argument('command', choices=['import', 'export'])
+    parser.add_argument('--db', default=os.getenv('STATE_DB_PATH', 'email_auto_state.sqlite'))
+    parser.add_argument('--campaign-dir', action='append', default=[],
+                        help="Campaign folder under output/ holding a *_SendStatus.csv file (repeatable)")
+    parser.add_argument('--domain-count-file', default=os.getenv('DOMAIN_EMAIL_COUNT_CSV_FILE_PATH', 'domainEmailCount.csv'))
+    parser.add_argument('--blacklist-file', default=os.getenv('BLACKLIST_FILE_PATH', 'blacklist_domains.txt'))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    store = EmailAutoSQLiteStore(logging, args.db)
+    try:
+        if args.command == 'import':
+            for campaign_dir in args.campaign_dir:
+                for status_file in glob.glob(os.path.join(campaign_dir, '*_SendStatus.csv')):
+                    print(f"Imported {store.import_send_status_file(status_file)} status rows from {status_file}")
+            if os.path.exists(args.domain_count_file):
+                print(f"Imported {store.import_domain_email_count_file(args.domain_count_file)} domain counts")
+            if os.path.exists(args.blacklist_file):
+                print(f"Imported {store.import_blacklist_file(args.blacklist_file)} blacklisted domains")
+        else:
+            for campaign_dir in args.campaign_dir:
+                campaign = os.path.basename(os.path.normpath(campaign_dir))
+                status_file = os.path.join(campaign_dir, campaign + '_SendStatus.csv')
+                print(f"Exported {store.export_send_status_file(campaign, status_file)} status rows to {status_file}")
+            print(f"Exported {store.export_domain_email_count_file(args.domain_count_file)} domain counts")
+            print(f"Exported {store.export_blacklist_file(args.blacklist_file)} blacklisted domains")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
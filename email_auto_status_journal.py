@@ -0,0 +1,104 @@
+import csv
+import os
+import logging
+
+
+class EmailAutoStatusJournal:
+    def __init__(self, logging, email_send_status_file, fields, fsync=False):
+        self.email_send_status_file = email_send_status_file
+        self.journal_file = email_send_status_file + '.journal'
+        self.fields = fields
+        self.fsync = fsync
+        self.logging = logging
+        self.journal_handle = None
+        self.journal_writer = None
+        self.pending_records = 0
+
+    def logINFO(self, message):
+        self.logging.info(f"[{self.__class__.__name__}] {message}")
+
+    def logERROR(self, message):
+        self.logging.error(f"[{self.__class__.__name__}] {message}")
+
+    def logWARNING(self, message):
+        self.logging.warning(f"[{self.__class__.__name__}] {message}")
+
+    def read_rows(self, file_path):
+        with open(file_path, 'r', newline='') as file:
+            reader = csv.DictReader(file, fieldnames=self.fields)
+            for row in reader:
+                # Skip the header line and any record torn by a crash mid-write
+                if row['emailId'] == 'emailId' or None in row.values() or None in row:
+                    continue
+                yield row
+
+    def load(self, status_dict):
+        # Canonical CSV first, then replay the journal so the latest outcome per email wins
+        if os.path.exists(self.email_send_status_file):
+            for row in self.read_rows(self.email_send_status_file):
+                status_dict[row['emailId']] = self.to_status(row)
+        self.pending_records = 0
+        if os.path.exists(self.journal_file):
+            for row in self.read_rows(self.journal_file):
+                status_dict[row['emailId']] = self.to_status(row)
+                self.pending_records += 1
+            self.logINFO(f"Replayed {self.pending_records} journal records from {self.journal_file}")
+        return status_dict
+
+    def to_status(self, row):
+        try:
+            retry_count = int(row['retry_count'])
+        except ValueError:
+            retry_count = 0
+        return {
+            'FullName': row['FullName'],
+            'timestamp': row['timestamp'],
+            'send_status': row['send_status'],
+            'delivery_status_code': row['delivery_status_code'],
+            'retry_count': retry_count,
+            'error_message': row['error_message'],
+            'delivery_duration': row['delivery_duration']
+        }
+
+    def to_row(self, email, data):
+        return {
+            'emailId': email,
+            'FullName': data['FullName'],
+            'timestamp': data['timestamp'],
+            'send_status': data['send_status'],
+            'delivery_status_code': data['delivery_status_code'],
+            'retry_count': data['retry_count'],
+            'error_message': data['error_message'],
+            'delivery_duration': data['delivery_duration']
+        }
+
+    def append(self, email, data):
+        if self.journal_handle is None:
+            self.journal_handle = open(self.journal_file, 'a', newline='')
+            self.journal_writer = csv.DictWriter(self.journal_handle, fieldnames=self.fields)
+        self.journal_writer.writerow(self.to_row(email, data))
+        self.journal_handle.flush()
+        if self.fsync:
+            os.fsync(self.journal_handle.fileno())
+        self.pending_records += 1
+
+    def close(self):
+        if self.journal_handle is not None:
+            self.journal_handle.close()
+            self.journal_handle = None
+            self.journal_writer = None
+
+    def compact(self, status_dict):
+        # Write the canonical CSV next to the original and swap it in atomically
+        self.close()
+        temp_file = self.email_send_status_file + '.tmp'
+        with open(temp_file, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=self.fields)
+            writer.writeheader()
+            for email, data in status_dict.items():
+                writer.writerow(self.to_row(email, data))
+        os.replace(temp_file, self.email_send_status_file)
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+        self.logINFO(f"Compacted {self.pending_records} journal records into {self.email_send_status_file}")
+        self.pending_records = 0
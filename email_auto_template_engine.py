@@ -0,0 +1,87 @@
+import re
+import logging
+
+
+class EmailAutoTemplate:
+    FIELD_PATTERN = re.compile(r"\{\{\s*([A-Za-z_][\w ]*?)\s*((?:\|\s*\w+\s*)*)\}\}|\[Placeholder\]")
+
+    FILTERS = {
+        'first_name': lambda value: value.split()[0] if value.split() else '',
+        'last_name': lambda value: value.split()[-1] if value.split() else '',
+        'upper': str.upper,
+        'lower': str.lower,
+        'title': str.title,
+        'strip': str.strip,
+    }
+
+    def __init__(self, text, default_value=''):
+        self.text = text
+        self.default_value = default_value
+        self.literals = []
+        self.fields = []
+        self.compile()
+
+    def compile(self):
+        # Split the template once into literal chunks and (column, filters) slots
+        position = 0
+        for match in self.FIELD_PATTERN.finditer(self.text):
+            self.literals.append(self.text[position:match.start()])
+            if match.group(0) == '[Placeholder]':
+                # Legacy placeholder: the recipient's first name
+                self.fields.append(('fullName', (self.FILTERS['first_name'],)))
+            else:
+                filters = []
+                for name in match.group(2).split('|')[1:]:
+                    name = name.strip()
+                    if name not in self.FILTERS:
+                        raise ValueError(f"Unknown template filter '{name}' in {match.group(0)}")
+                    filters.append(self.FILTERS[name])
+                self.fields.append((match.group(1), tuple(filters)))
+            position = match.end()
+        self.literals.append(self.text[position:])
+
+    def field_names(self):
+        return sorted({column for column, _ in self.fields})
+
+    def render(self, row):
+        parts = [self.literals[0]]
+        for (column, filters), literal in zip(self.fields, self.literals[1:]):
+            value = row.get(column)
+            value = self.default_value if value is None else str(value)
+            for apply_filter in filters:
+                value = apply_filter(value)
+            parts.append(value)
+            parts.append(literal)
+        return ''.join(parts)
+
+
+class EmailAutoTemplateEngine:
+    def __init__(self, logging, subject_text, body_text):
+        self.logging = logging
+        self.subject_template = EmailAutoTemplate(subject_text)
+        self.body_template = EmailAutoTemplate(body_text)
+        self.logINFO(f"Compiled templates using fields: "
+                     f"{sorted(set(self.subject_template.field_names()) | set(self.body_template.field_names()))}")
+
+    def logINFO(self, message):
+        self.logging.info(f"[{self.__class__.__name__}] {message}")
+
+    def logERROR(self, message):
+        self.logging.error(f"[{self.__class__.__name__}] {message}")
+
+    def logWARNING(self, message):
+        self.logging.warning(f"[{self.__class__.__name__}] {message}")
+
+    def missing_fields(self, columns):
+        used = set(self.subject_template.field_names()) | set(self.body_template.field_names())
+        return sorted(used - set(columns))
+
+    def render(self, row):
+        return self.subject_template.render(row), self.body_template.render(row)
+
+    def render_many(self, rows):
+        # Lazily render (row, subject, body) for any iterable of recipient rows
+        subject_template = self.subject_template
+        body_template = self.body_template
+        for row in rows:
+            yield row, subject_template.render(row), body_template.render(row)
@@ -0,0 +1,33 @@
+import logging
+import unittest
+
+from email_auto_domain_blacklist import EmailAutoDomainBlacklist
+
+
+class TestEmailAutoDomainBlacklist(unittest.TestCase):
+    def setUp(self):
+        self.blacklist = EmailAutoDomainBlacklist(logging, None)
+
+    def test_rule_kinds(self):
+        self.blacklist.add_domain('example.com')
+        self.blacklist.add_domain('=exact.com')
+        self.blacklist.add_domain('*.sub.com')
+        self.assertTrue(self.blacklist.is_blacklisted('example.com'))
+        self.assertTrue(self.blacklist.is_blacklisted('mail.example.com'))
+        self.assertTrue(self.blacklist.is_blacklisted('exact.com'))
+        self.assertFalse(self.blacklist.is_blacklisted('mail.exact.com'))
+        self.assertFalse(self.blacklist.is_blacklisted('sub.com'))
+        self.assertTrue(self.blacklist.is_blacklisted('mail.sub.com'))
+        self.assertFalse(self.blacklist.is_blacklisted('other.com'))
+
+    def test_domain_with_empty_label(self):
+        self.blacklist.add_domain('=example.com')
+        self.blacklist.add_domain('a..b')
+        self.assertFalse(self.blacklist.is_blacklisted('foo..example.com'))
+        self.assertTrue(self.blacklist.is_blacklisted('a..b'))
+        self.assertTrue(self.blacklist.is_blacklisted('x.a..b'))
+        self.assertFalse(self.blacklist.is_blacklisted('a.b'))
+
+
+if __name__ == '__main__':
+    unittest.main()